@@ -1,17 +1,20 @@
-import os
 import csv
-import shutil
 from pathlib import Path
 
+from materialise import MANIFEST_FILENAME, materialise, summary
+
 # === Paths (Update these) ===
 csv_file = '/home/Sharedata/sandipan/Voice_Editing_VTLN/VTLN-Experiment/EAAI-Final-Dataset/MPS_Raw_files_shortlisted_files_based_on_SNR_15db.csv'
 source_root = Path('/home/Sharedata/sandipan/Voice_Editing_VTLN/VTLN-Experiment/SNR_Experiment/MPS_Enhanced_DNS_64/')  # <-- No speaker_id folder now
 target_root = Path('/home/Sharedata/sandipan/Voice_Editing_VTLN/VTLN-Experiment/EAAI-Final-Dataset/Final_MPS_Speakers')  # Update this to desired copy location
+# copy, or hardlink / symlink / reflink to build the tree without duplicating the audio
+materialise_mode = 'copy'
 
 # Create target root if it doesn't exist
 target_root.mkdir(parents=True, exist_ok=True)
 
-# Read the CSV and process each row
+# Read the CSV and collect (source, target) pairs
+to_copy = []
 with open(csv_file, 'r') as f:
     reader = csv.DictReader(f)
     for row in reader:
@@ -24,17 +27,18 @@ with open(csv_file, 'r') as f:
         # Updated source path: /source_root/top_folder/PCM/filename
         source_path = source_root / top_folder / 'PCM' / filename
 
-        # Target folder: /target_root/top_folder/
-        target_folder = target_root / top_folder
-        target_path = target_folder / filename
-
-        # Create target subfolder if needed
-        target_folder.mkdir(parents=True, exist_ok=True)
+        # Target path: /target_root/top_folder/filename
+        target_path = target_root / top_folder / filename
 
-        # Copy the file
         if source_path.exists():
-            shutil.copy2(source_path, target_path)
-            print(f"Copied: {source_path} -> {target_path}")
+            to_copy.append((source_path, target_path))
         else:
             print(f"File not found: {source_path}")
 
+# Copy on a thread pool; files already identical in the target are skipped,
+# so re-creating Final_MPS_Speakers costs little
+results = materialise(to_copy, mode=materialise_mode, manifest_path=target_root / MANIFEST_FILENAME)
+for result in results:
+    if result['action'] == 'error':
+        print(f"Error copying {result['source']}: {result['detail']}")
+print(f"{target_root}: {summary(results)}")
@@ -1,44 +1,69 @@
 import os
 import csv
-import shutil
+import wave
 from pathlib import Path
 
+from materialise import MANIFEST_FILENAME, materialise, summary
+from snr_cache import SNRCache, default_cache_path
+from snr_utils import cached_window_snr_decision
+from wav_index import walk_wavs
+
 # Paths
 csv_file = '/home/drsandipan/Desktop/VTLN-Experiment/mps_dataset/MPS_SNR_Results.csv'
 source_root = Path('/home/drsandipan/Desktop/VTLN-Experiment/MPS_Dataset/')
 target_root = Path('/home/drsandipan/Desktop/VTLN-Experiment/mps_dataset/Final_MPS_Dataset_EAAI/')
+# copy, or hardlink / symlink / reflink to build the tree without duplicating the audio
+materialise_mode = 'copy'
 
 # Ensure the target root exists
 target_root.mkdir(parents=True, exist_ok=True)
 
-# Track which folders are created
-created_speakers = set()
+# SNR rows (SpeakerID, Filename, SNR_dB): from the step-1 CSV when it exists,
+# otherwise decided from the audio. Only "is it >= 15 dB" matters here, so each
+# file's windows are scored until the outcome is certain (SNR_dB is then the
+# average of the windows scored so far, on the same side of 15 dB).
+def snr_rows():
+    if os.path.exists(csv_file):
+        with open(csv_file, 'r') as f:
+            yield from csv.DictReader(f)
+        return
+    print(f"{csv_file} not found, deciding SNR >= 15 dB from the audio")
+    with SNRCache(default_cache_path(source_root)) as cache:
+        for file_path in walk_wavs(source_root):
+            try:
+                passed, estimate, reason = cached_window_snr_decision(file_path, 15.0, cache)
+            except (wave.Error, EOFError) as e:
+                print(f"Error processing {file_path}: {e!r}")
+                continue
+            if reason is not None:
+                continue
+            yield {'SpeakerID': Path(file_path).parent.name,
+                   'Filename': os.path.basename(file_path),
+                   'SNR_dB': estimate if estimate is not None else 'nan'}
+
 
 # Read and process CSV
-with open(csv_file, 'r') as f:
-    reader = csv.DictReader(f)
-    for row in reader:
-        speaker_id = row['SpeakerID']
-        filename = row['Filename']
-        try:
-            snr = float(row['SNR_dB'])
-        except ValueError:
-            print(f"Invalid SNR for {filename}, skipping.")
-            continue
-
-        if snr >= 15.0:
-            source_file = source_root / speaker_id / filename
-            target_speaker_folder = target_root / speaker_id
-
-            # Create target speaker folder if not already done
-            if speaker_id not in created_speakers:
-                target_speaker_folder.mkdir(parents=True, exist_ok=True)
-                created_speakers.add(speaker_id)
-
-            if source_file.exists():
-                target_file = target_speaker_folder / filename
-                shutil.copy2(source_file, target_file)
-                print(f"Copied: {source_file} -> {target_file}")
-            else:
-                print(f"File not found: {source_file}")
+to_copy = []
+for row in snr_rows():
+    speaker_id = row['SpeakerID']
+    filename = row['Filename']
+    try:
+        snr = float(row['SNR_dB'])
+    except ValueError:
+        print(f"Invalid SNR for {filename}, skipping.")
+        continue
+
+    if snr >= 15.0:
+        source_file = source_root / speaker_id / filename
+        if source_file.exists():
+            to_copy.append((source_file, target_root / speaker_id / filename))
+        else:
+            print(f"File not found: {source_file}")
 
+# Copy on a thread pool; files already identical in the target are skipped,
+# so re-running over an existing Final_MPS_Dataset_EAAI costs little
+results = materialise(to_copy, mode=materialise_mode, manifest_path=target_root / MANIFEST_FILENAME)
+for result in results:
+    if result['action'] == 'error':
+        print(f"Error copying {result['source']}: {result['detail']}")
+print(f"{target_root}: {summary(results)}")
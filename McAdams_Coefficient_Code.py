@@ -2,13 +2,136 @@
 # -*- coding: utf-8 -*-
 
 import os
+import json
+import time
+from collections import namedtuple
+
 import numpy as np
 import librosa
 import soundfile as sf
 import scipy.signal
 
+from wav_reader import read_float32_mono
 
-def anonym_v2(freq, samples, winLengthinms=20, shiftLengthinms=10, lp_order=20, mcadams=0.8):
+
+def lpc_poles(lpc_coefs):
+    """
+    Poles of every frame's all-pole filter 1 / A(z), shape (nframe, order).
+
+    Each A(z) = [1, a1, ..., ap] gets the companion matrix np.roots builds
+    (first row -a[1:] / a[0], ones below the diagonal) and all of them are
+    solved in one batched np.linalg.eigvals call, so the poles are the ones
+    scipy.signal.tf2zpk([1], a) finds frame by frame. Frames with
+    non-finite coefficients (which eigvals rejects for the whole batch) are
+    solved one at a time with tf2zpk, as before.
+    """
+    lpc_coefs = np.asarray(lpc_coefs)
+    nframe, order = lpc_coefs.shape[0], lpc_coefs.shape[1] - 1
+    companion = np.zeros((nframe, order, order), dtype=np.result_type(lpc_coefs, np.float64))
+    companion[:, 0, :] = -lpc_coefs[:, 1:] / lpc_coefs[:, :1]
+    companion[:, np.arange(1, order), np.arange(order - 1)] = 1.0
+    finite = np.isfinite(companion).all(axis=(1, 2))
+    poles = np.empty((nframe, order), dtype=np.complex128)
+    if finite.any():
+        poles[finite] = np.linalg.eigvals(companion[finite])
+    for i in np.flatnonzero(~finite):
+        poles[i] = scipy.signal.tf2zpk(np.array([1]), lpc_coefs[i])[1]
+    return poles
+
+
+def poly_batch(roots):
+    """
+    np.poly of every row of `roots` (nframe, n) -> (nframe, n + 1): the
+    monic polynomials, built with the same root-by-root products np.poly
+    uses (they agree to ~1e-12). Complex; take the real part for
+    conjugate-symmetric roots.
+    """
+    roots = np.asarray(roots, dtype=np.complex128)
+    coefs = np.zeros((roots.shape[0], roots.shape[1] + 1), dtype=np.complex128)
+    coefs[:, 0] = 1.0
+    for k in range(roots.shape[1]):
+        # (c0 + c1 z^-1 + ...) * (1 - r z^-1), all frames at once
+        coefs[:, 1:k + 2] -= roots[:, k:k + 1] * coefs[:, :k + 1].copy()
+    return coefs
+
+
+def lpc_residual_batch(lpc_coefs, frames):
+    """
+    lfilter(a, 1, frame) for every row of `frames` (nframe, L), each with
+    its own coefficients and zero initial state: one product of a strided
+    view of the zero-padded frames with the coefficients.
+    """
+    frames = np.asarray(frames, dtype=np.float64)
+    coefs = np.asarray(lpc_coefs, dtype=np.float64)
+    coefs = coefs / coefs[:, :1]  # lfilter normalises by a[0]
+    order = coefs.shape[1] - 1
+    # res[i, n] = sum_k coefs[i, k] * frames[i, n - k]
+    padded = np.concatenate([np.zeros((frames.shape[0], order)), frames], axis=1)
+    taps = np.lib.stride_tricks.sliding_window_view(padded, order + 1, axis=1)  # (nframe, L, order + 1)
+    return np.einsum("nlk,nk->nl", taps, coefs[:, ::-1])
+
+
+def allpole_synthesis_batch(lpc_coefs, residual):
+    """
+    lfilter(1, a, residual) for every row of `residual` (nframe, L), each
+    with its own coefficients and zero initial state: a recursion over the
+    L samples, each step done for all frames.
+    """
+    residual = np.asarray(residual, dtype=np.float64)
+    coefs = np.asarray(lpc_coefs, dtype=np.float64)
+    coefs = coefs / coefs[:, :1]
+    nframe, length = residual.shape
+    order = coefs.shape[1] - 1
+    # y[i, n] = residual[i, n] - sum_k coefs[i, k] * y[i, n - k], k = 1..order
+    y = np.zeros((nframe, order + length))
+    feedback = np.ascontiguousarray(coefs[:, :0:-1])  # coefs[:, order], ..., coefs[:, 1]
+    for n in range(length):
+        y[:, order + n] = residual[:, n] - np.einsum("nk,nk->n", y[:, n:order + n], feedback)
+    return y[:, order:]
+
+
+def lpc_ana_syn_batch(old_lpc_coefs, new_lpc_coefs, frames):
+    """lfilter(old, 1, frame) followed by lfilter(1, new, residual), for every row of `frames`."""
+    return allpole_synthesis_batch(new_lpc_coefs, lpc_residual_batch(old_lpc_coefs, frames))
+
+
+def overlap_add(frames, shift, length):
+    """
+    Sum of frames (nframe, winlen) placed every `shift` samples, cut to
+    `length`: frames are zero-padded to a whole number of hops, so the sum
+    is one reshaped add per hop a frame spans.
+    """
+    nframe, winlen = frames.shape
+    hops = -(-winlen // shift)
+    padded = np.zeros((nframe, hops * shift))
+    padded[:, :winlen] = frames
+    out = np.zeros(max(length, (nframe + hops - 1) * shift))
+    for q in range(hops):
+        out[q * shift:(q + nframe) * shift] += padded[:, q * shift:(q + 1) * shift].reshape(-1)
+    return out[:length]
+
+
+def _mcadam_angle(poles, mcadams):
+    old_angles = np.angle(poles)
+    new_angles = np.copy(old_angles)
+    real_idx = ~np.isreal(poles)
+    neg_idx = np.bitwise_and(real_idx, old_angles < 0.0)
+    pos_idx = np.bitwise_and(real_idx, old_angles > 0.0)
+    new_angles[neg_idx] = -((-old_angles[neg_idx]) ** mcadams)
+    new_angles[pos_idx] = old_angles[pos_idx] ** mcadams
+    return new_angles
+
+
+def _new_poles(old_poles, new_angles):
+    return np.abs(old_poles) * np.exp(1j * new_angles)
+
+
+# Everything anonym_v2 computes before the McAdams coefficient is used
+LPCAnalysis = namedtuple("LPCAnalysis", "win shift length_sig lpc_coefs poles residual")
+
+
+def lpc_analysis(freq, samples, winLengthinms=20, shiftLengthinms=10, lp_order=20):
+    """Framing, LPC, poles and residual of a signal: the part of anonym_v2 shared by all coefficients."""
     eps = np.finfo(np.float32).eps
     samples = samples + eps
 
@@ -22,50 +145,35 @@ def anonym_v2(freq, samples, winLengthinms=20, shiftLengthinms=10, lp_order=20,
 
     frames = librosa.util.frame(samples, frame_length=winlen, hop_length=shift).T
     windowed_frames = frames * win
-    nframe = windowed_frames.shape[0]
 
     lpc_coefs = librosa.core.lpc(windowed_frames + eps, order=lp_order, axis=1)
-    ar_poles = np.array([scipy.signal.tf2zpk(np.array([1]), x)[1] for x in lpc_coefs])
-
-    def _mcadam_angle(poles, mcadams):
-        old_angles = np.angle(poles)
-        new_angles = np.copy(old_angles)
-        real_idx = ~np.isreal(poles)
-        neg_idx = np.bitwise_and(real_idx, old_angles < 0.0)
-        pos_idx = np.bitwise_and(real_idx, old_angles > 0.0)
-        new_angles[neg_idx] = -((-old_angles[neg_idx]) ** mcadams)
-        new_angles[pos_idx] = old_angles[pos_idx] ** mcadams
-        return new_angles
+    return LPCAnalysis(win, shift, length_sig, lpc_coefs, lpc_poles(lpc_coefs),
+                       lpc_residual_batch(lpc_coefs, windowed_frames))
 
-    def _new_poles(old_poles, new_angles):
-        return np.abs(old_poles) * np.exp(1j * new_angles)
 
-    def _lpc_ana_syn(old_lpc_coef, new_lpc_coef, data):
-        res = scipy.signal.lfilter(old_lpc_coef, np.array(1), data)
-        return scipy.signal.lfilter(np.array([1]), new_lpc_coef, res)
+def mcadams_frames(analysis, mcadams=0.8):
+    """The windowed reconstructed frames for one McAdams coefficient, before overlap-add."""
+    # Elementwise, so all frames are warped and rebuilt at once; the output
+    # matches the frame-by-frame tf2zpk / np.poly version to within 1e-9 of its peak
+    pole_new_angles = _mcadam_angle(analysis.poles, mcadams)
+    poles_new = _new_poles(analysis.poles, pole_new_angles)
+    new_lpc_coefs = np.real(poly_batch(poles_new))
+    return allpole_synthesis_batch(new_lpc_coefs, analysis.residual) * analysis.win
 
-    pole_new_angles = np.array([_mcadam_angle(poles, mcadams) for poles in ar_poles])
-    poles_new = np.array([_new_poles(ar_poles[i], pole_new_angles[i]) for i in range(nframe)])
 
-    recon_frames = [
-        _lpc_ana_syn(lpc_coefs[i], np.real(np.poly(poles_new[i])), windowed_frames[i])
-        for i in range(nframe)
-    ]
-    recon_frames = np.stack(recon_frames, axis=0) * win
+def mcadams_synthesis(analysis, mcadams=0.8):
+    """The anonymised signal for one McAdams coefficient from an lpc_analysis."""
+    return overlap_add(mcadams_frames(analysis, mcadams), analysis.shift, analysis.length_sig)
 
-    anonymized_data = np.zeros(length_sig)
-    for i in range(nframe):
-        start = i * shift
-        end = start + winlen
-        if end > length_sig:
-            break
-        anonymized_data[start:end] += recon_frames[i, :end - start]
 
-    return anonymized_data
+def anonym_v2(freq, samples, winLengthinms=20, shiftLengthinms=10, lp_order=20, mcadams=0.8):
+    analysis = lpc_analysis(freq, samples, winLengthinms, shiftLengthinms, lp_order)
+    return mcadams_synthesis(analysis, mcadams)
 
 
 def apply_mcadams_to_file(input_path, output_path, mcadams=0.8, winLengthinms=20, shiftLengthinms=10, lp_order=20):
-    samples, sr = librosa.load(input_path, sr=None)
+    # Same float32 mono samples as librosa.load(sr=None); 16-bit PCM is memory-mapped
+    samples, sr = read_float32_mono(input_path)
     anon = anonym_v2(
         freq=sr,
         samples=samples,
@@ -75,27 +183,250 @@ def apply_mcadams_to_file(input_path, output_path, mcadams=0.8, winLengthinms=20
         mcadams=mcadams,
     )
     anon = anon / np.max(np.abs(anon)) * 0.99
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    sf.write(output_path, anon, sr)
+    write_wav_atomic(output_path, anon, sr)
+
+
+def write_wav_atomic(output_path, data, sr):
+    # Written under a temporary name and renamed, so a crash never leaves a truncated WAV
+    folder = os.path.dirname(output_path)
+    os.makedirs(folder, exist_ok=True)
+    tmp = os.path.join(folder, f".{os.path.basename(output_path)}.tmp{os.getpid()}")
+    try:
+        sf.write(tmp, data, sr, format="WAV")
+        os.replace(tmp, output_path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def _read_mono_block(sound_file, start, count):
+    # float32 mono samples [start, start + count), the values read_float32_mono gives
+    sound_file.seek(start)
+    block = sound_file.read(count, dtype="float32", always_2d=True)
+    return block[:, 0] if block.shape[1] == 1 else block.mean(axis=1)
+
+
+def apply_mcadams_to_file_streaming(input_path, output_path, mcadams=0.8, winLengthinms=20,
+                                    shiftLengthinms=10, lp_order=20, block_frames=1000):
+    """
+    apply_mcadams_to_file in bounded memory: the signal is read, analysed
+    and synthesised `block_frames` frames at a time. Each block's frames
+    are overlap-added together with the last (frames per hop - 1) frames of
+    the block before, in the same order as the whole-file sum, so the
+    output is sample-identical to apply_mcadams_to_file. The unnormalised
+    signal goes to a float64 scratch file next to the output (8 bytes per
+    sample); a second pass scales it by its peak and writes the WAV.
+    """
+    with sf.SoundFile(input_path) as src:
+        sr, length_sig = src.samplerate, src.frames
+        winlen = int(np.floor(winLengthinms * 0.001 * sr))
+        shift = int(np.floor(shiftLengthinms * 0.001 * sr))
+        if length_sig < winlen:
+            # Too short to frame: let the whole-file path raise its usual error
+            return apply_mcadams_to_file(input_path, output_path, mcadams, winLengthinms,
+                                         shiftLengthinms, lp_order)
+        nframe = 1 + (length_sig - winlen) // shift
+        hops = -(-winlen // shift)  # hops a frame spans
 
+        folder = os.path.dirname(output_path)
+        os.makedirs(folder, exist_ok=True)
+        scratch = os.path.join(folder, f".{os.path.basename(output_path)}.raw{os.getpid()}")
+        peak = 0.0
+        try:
+            with open(scratch, "wb") as raw:
+                carry = np.zeros((0, winlen))
+                for first in range(0, nframe, block_frames):
+                    count = min(block_frames, nframe - first)
+                    samples = _read_mono_block(src, first * shift, (count - 1) * shift + winlen)
+                    analysis = lpc_analysis(sr, samples, winLengthinms, shiftLengthinms, lp_order)
+                    frames = np.concatenate([carry, mcadams_frames(analysis, mcadams)])
+                    summed = overlap_add(frames, shift, (len(frames) + hops - 1) * shift)
+                    # hops first .. first + count - 1 now have every contribution
+                    done = summed[len(carry) * shift:(len(carry) + count) * shift]
+                    if first + count == nframe:
+                        done = summed[len(carry) * shift:]  # plus the tail of the last frames
+                    done = done[:max(0, length_sig - first * shift)]
+                    peak = max(peak, float(np.max(np.abs(done), initial=0.0)))
+                    raw.write(done.tobytes())
+                    carry = frames[len(frames) - (hops - 1):] if hops > 1 else frames[:0]
+                written = min(length_sig, (nframe + hops - 1) * shift)
+                raw.write(np.zeros(length_sig - written).tobytes())
 
-def process_folder_recursively(input_dir, output_dir, mcadams=0.8):
+            tmp = os.path.join(folder, f".{os.path.basename(output_path)}.tmp{os.getpid()}")
+            try:
+                with open(scratch, "rb") as raw, sf.SoundFile(tmp, "w", samplerate=sr, channels=1,
+                                                              format="WAV") as dst:
+                    while True:
+                        block = np.fromfile(raw, dtype=np.float64, count=block_frames * shift)
+                        if len(block) == 0:
+                            break
+                        dst.write(block / peak * 0.99)
+                os.replace(tmp, output_path)
+            finally:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+        finally:
+            os.remove(scratch)
+
+
+def apply_mcadams_sweep_to_file(input_path, output_paths, winLengthinms=20, shiftLengthinms=10, lp_order=20):
+    """
+    apply_mcadams_to_file for several coefficients ({mcadams: output_path})
+    with one decode and one lpc_analysis; only the pole warping and
+    synthesis are repeated per coefficient.
+    """
+    samples, sr = read_float32_mono(input_path)
+    analysis = lpc_analysis(sr, samples, winLengthinms, shiftLengthinms, lp_order)
+    for mcadams, output_path in output_paths.items():
+        anon = mcadams_synthesis(analysis, mcadams)
+        anon = anon / np.max(np.abs(anon)) * 0.99
+        write_wav_atomic(output_path, anon, sr)
+
+
+def alpha_output_path(output_root, rel_path, mcadams, alpha_folder="{alpha:g}"):
+    """<output_root>/<alpha folder>/<rel_path>, the per-coefficient layout the ECAPA / Whisper scripts walk."""
+    return os.path.join(output_root, alpha_folder.format(alpha=mcadams), rel_path)
+
+
+def sweep_folder_recursively(input_dir, output_root, mcadams_values=(0.8, 1.0, 1.15), alpha_folder="{alpha:g}"):
+    """
+    process_folder_recursively for every coefficient in one pass over
+    input_dir: each file is analysed once and written to
+    <output_root>/<alpha folder>/<rel_path> for every coefficient.
+    `alpha_folder` formats the folder name, e.g. "{alpha:.2f}" for 0.80.
+    """
     for root, _, files in os.walk(input_dir):
         for file in files:
             if file.lower().endswith(".wav"):
                 input_path = os.path.join(root, file)
                 rel_path = os.path.relpath(input_path, input_dir)
-                output_path = os.path.join(output_dir, rel_path)
-                print(f"Processing {input_path} -> {output_path}")
-                apply_mcadams_to_file(input_path, output_path, mcadams=mcadams)
+                output_paths = {m: alpha_output_path(output_root, rel_path, m, alpha_folder)
+                                for m in mcadams_values}
+                print(f"Processing {input_path} -> {len(output_paths)} coefficients")
+                apply_mcadams_sweep_to_file(input_path, output_paths)
     print("✅ All files processed.")
 
 
+MANIFEST_FILENAME = ".mcadams_manifest.json"
+
+
+def _mcadams_task(task):
+    # (rel_path, seconds, error) of one file; errors are returned, not raised
+    input_path, output_path, rel_path, params, block_frames = task
+    start = time.perf_counter()
+    try:
+        if block_frames:
+            apply_mcadams_to_file_streaming(input_path, output_path, block_frames=block_frames, **params)
+        else:
+            apply_mcadams_to_file(input_path, output_path, **params)
+    except Exception as e:
+        return rel_path, time.perf_counter() - start, f"{type(e).__name__}: {e}"
+    return rel_path, time.perf_counter() - start, None
+
+
+def _up_to_date(input_path, output_path, entry, params):
+    # The output exists, is newer than its input and was made with these parameters
+    return (entry is not None and entry.get("params") == params and os.path.exists(output_path)
+            and os.path.getmtime(output_path) >= os.path.getmtime(input_path))
+
+
+def _save_manifest(manifest_path, manifest):
+    tmp = f"{manifest_path}.tmp{os.getpid()}"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp, manifest_path)
+
+
+def timing_summary(timings, top=5):
+    """Lines summarising {rel_path: seconds}: count, total, mean, median, max and the slowest files."""
+    if not timings:
+        return ["no files processed"]
+    seconds = np.array(list(timings.values()))
+    lines = [f"{len(seconds)} files in {seconds.sum():.2f} s of work: mean {seconds.mean():.2f} s, "
+             f"median {np.median(seconds):.2f} s, max {seconds.max():.2f} s"]
+    for rel_path, t in sorted(timings.items(), key=lambda item: -item[1])[:top]:
+        lines.append(f"  {t:8.2f} s  {rel_path}")
+    return lines
+
+
+def process_folder_recursively(input_dir, output_dir, mcadams=0.8, workers=1, force=False,
+                               winLengthinms=20, shiftLengthinms=10, lp_order=20, block_frames=None):
+    """
+    Anonymise every .wav under input_dir into the same structure under
+    output_dir, on `workers` processes (1 = in-process). Outputs newer than
+    their input and made with the same parameters (recorded in
+    <output_dir>/.mcadams_manifest.json) are skipped unless force=True, so
+    an interrupted run only redoes the missing files. With block_frames
+    set, files are streamed that many frames at a time
+    (apply_mcadams_to_file_streaming; same output, bounded memory).
+    Returns {rel_path: seconds} of the files processed in this run.
+    """
+    params = {"mcadams": mcadams, "winLengthinms": winLengthinms,
+              "shiftLengthinms": shiftLengthinms, "lp_order": lp_order}
+    manifest_path = os.path.join(output_dir, MANIFEST_FILENAME)
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+
+    tasks, skipped = [], 0
+    for root, _, files in os.walk(input_dir):
+        for file in files:
+            if file.lower().endswith(".wav"):
+                input_path = os.path.join(root, file)
+                rel_path = os.path.relpath(input_path, input_dir)
+                output_path = os.path.join(output_dir, rel_path)
+                if not force and _up_to_date(input_path, output_path, manifest.get(rel_path), params):
+                    skipped += 1
+                    continue
+                tasks.append((input_path, output_path, rel_path, params, block_frames))
+
+    os.makedirs(output_dir, exist_ok=True)
+    pool = None
+    if workers > 1 and len(tasks) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        pool = ProcessPoolExecutor(max_workers=workers)
+        results = pool.map(_mcadams_task, tasks)
+    else:
+        results = map(_mcadams_task, tasks)
+
+    timings, failed = {}, {}
+    try:
+        for i, (rel_path, seconds, error) in enumerate(results, start=1):
+            if error is not None:
+                failed[rel_path] = error
+                print(f"[{i}/{len(tasks)}] ❌ {rel_path}: {error}")
+                continue
+            timings[rel_path] = seconds
+            # Recorded as each file lands, so a crash loses at most the files in flight
+            manifest[rel_path] = {"params": params, "seconds": round(seconds, 3)}
+            _save_manifest(manifest_path, manifest)
+            print(f"[{i}/{len(tasks)}] {rel_path} ({seconds:.2f} s)")
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+    print(f"✅ {len(timings)} processed, {skipped} already up to date, {len(failed)} failed.")
+    print("\n".join(timing_summary(timings)))
+    return timings
+
+
 if __name__ == "__main__":
     # === CHANGE THESE PATHS ===
     input_base_dir = "/path/to/input/folder"     # <-- change to your source
     output_base_dir = "/path/to/output/folder"   # <-- same structure, same names
     mcadams_value = 0.8                          # Try 0.5 to 1.2
+    # Several coefficients at once (analysed once per file), written to
+    # <output_base_dir>/<alpha>/<same structure>; None renders only mcadams_value
+    mcadams_sweep = None                         # e.g. (0.8, 1.0, 1.15)
+    workers = os.cpu_count()                     # 1 = one file at a time
+    # Frames per block for long recordings (bounded memory, same output); None reads whole files
+    block_frames = None                          # e.g. 1000 (10 s at a 10 ms shift)
 
-    process_folder_recursively(input_base_dir, output_base_dir, mcadams=mcadams_value)
+    if mcadams_sweep:
+        sweep_folder_recursively(input_base_dir, output_base_dir, mcadams_values=mcadams_sweep)
+    else:
+        # Outputs already up to date are skipped, so re-running finishes an interrupted set
+        process_folder_recursively(input_base_dir, output_base_dir, mcadams=mcadams_value, workers=workers,
+                                   block_frames=block_frames)
 
@@ -16,10 +16,11 @@
 
 import os
 import random
-import shutil
 import csv
 import re
 
+from materialise import MANIFEST_FILENAME, materialise, summary
+
 # ----------- Input file paths --------------
 spk2age_path = "/home/drsandipan/Desktop/VTLN-Experiment/Speech_Ocean_Dataset/test/spk2age"
 spk2gender_path = "/home/drsandipan/Desktop/VTLN-Experiment/Speech_Ocean_Dataset/test/spk2gender"
@@ -27,6 +28,7 @@ text_file_path = "/home/drsandipan/Desktop/VTLN-Experiment/Speech_Ocean_Dataset/
 source_root_dir = "/home/drsandipan/Desktop/VTLN-Experiment/Speech_Ocean_Dataset/WAVE"
 destination_root_dir = "/home/drsandipan/Desktop/VTLN-Experiment/Speech_Ocean_Dataset/EAAI-Speech_Ocean_10_spk_15_uttr/"
 output_csv_path = "/home/drsandipan/Desktop/VTLN-Experiment/Speech_Ocean_Dataset/test/EAAI_test_speaker_data_10_spk_15_uttr.csv"
+materialise_mode = "copy"  # or "hardlink" / "symlink" / "reflink" (no second copy of the audio)
 
 # ----------- Helper function: Clean text --------------
 def clean_text(text):
@@ -61,6 +63,7 @@ if not os.path.exists(destination_root_dir):
     os.makedirs(destination_root_dir)
 
 copied_files = []
+to_copy = []
 
 for spk in selected_spk_ids:
     folder_name = f"SPEAKER{spk}"
@@ -73,15 +76,19 @@ for spk in selected_spk_ids:
     selected_wavs = random.sample(all_wavs, min(15, len(all_wavs)))
 
     spk_dest_dir = os.path.join(destination_root_dir, folder_name)
-    os.makedirs(spk_dest_dir, exist_ok=True)
 
     for wav_file in selected_wavs:
         src_path = os.path.join(folder_path, wav_file)
         new_name = os.path.splitext(wav_file)[0] + ".wav"
         dest_path = os.path.join(spk_dest_dir, new_name)
-        shutil.copyfile(src_path, dest_path)
+        to_copy.append((src_path, dest_path))
         copied_files.append((folder_name, spk, new_name))  # SPEAKERxxxx, numeric id, file name
 
+# Copy on a thread pool; files already identical in the destination are skipped
+results = materialise(to_copy, mode=materialise_mode,
+                      manifest_path=os.path.join(destination_root_dir, MANIFEST_FILENAME))
+print(f"{destination_root_dir}: {summary(results)}")
+
 # ----------- Step 5: Load transcription mapping from `text` ----------
 utt_text_map = {}
 with open(text_file_path, "r") as f:
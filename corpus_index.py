@@ -0,0 +1,312 @@
+"""
+Queryable SQLite index of the Speech Ocean and MPS corpus metadata.
+
+Speakers (age, gender, grade) and utterances (speaker, transcript, file
+path, duration, cached SNR) of both corpora are kept in one database with
+indexes on the columns the selection scripts filter on, so questions such
+as "females aged 6-10 with >= 15 utterances at >= 15 dB" are a single
+query that never opens an audio file.
+
+Sources:
+    Speech Ocean: spk2age, spk2gender and text from the metadata folder;
+                  WAVs under <wave_root>/SPEAKER<id>/.
+    MPS:          MPS_Enhanced_Files_Complete_Details.csv (speakerID,
+                  gender, grade, paragraphID, manualTranscript, SNR_dB);
+                  WAVs found anywhere under the audio root by file name.
+Durations come from the wav_index header index and SNRs from the
+snr_cache file in the audio root, falling back to the SNR_dB listed in the
+MPS CSV (nothing is decoded here).
+
+Builds are incremental: metadata files are only re-parsed when their size
+or mtime changed and WAV headers are only re-read for new or changed
+files. Speech Ocean utterances follow the WAVs on disk; MPS utterances
+follow the CSV, and lose their path when the file disappears.
+
+Usage:
+    python corpus_index.py <index.sqlite> add-ocean <metadata_dir> <wave_root>
+    python corpus_index.py <index.sqlite> add-mps <details.csv> <audio_root>
+    python corpus_index.py <index.sqlite> speakers --corpus ocean --gender f --age 6 10 --min-snr 15 --min-count 15
+    python corpus_index.py <index.sqlite> stats
+"""
+
+import os
+import sys
+import csv
+import sqlite3
+import argparse
+
+from snr_cache import SNRCache, default_cache_path
+from snr_utils import snr_params
+from wav_index import WavHeaderIndex, default_index_path, header_duration, walk_wavs
+
+SPEECH_OCEAN = "ocean"
+MPS = "mps"
+# window_snr options each corpus is scored with (cache keys)
+SNR_OPTIONS = {
+    SPEECH_OCEAN: {"min_duration": 0.5, "partial_windows": True},
+    MPS: {"min_duration": 7.0},
+}
+
+
+def _normalise_gender(gender):
+    # 'f' / 'm' for both corpora (Speech Ocean: f/m, MPS: Female/Male)
+    gender = (gender or "").strip().lower()
+    return gender[:1] if gender[:1] in ("f", "m") else None
+
+
+def _float_or_none(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _read_pairs(path):
+    # "<key> <value...>" lines, as in spk2age / spk2gender / text
+    pairs = {}
+    with open(path, "r") as f:
+        for line in f:
+            parts = line.strip().split(maxsplit=1)
+            if len(parts) == 2:
+                pairs[parts[0]] = parts[1]
+    return pairs
+
+
+class CorpusIndex:
+    def __init__(self, db_path):
+        self.conn = sqlite3.connect(db_path)
+        self.conn.executescript(
+            "CREATE TABLE IF NOT EXISTS speakers ("
+            " corpus TEXT NOT NULL,"
+            " speaker TEXT NOT NULL,"
+            " age INTEGER,"
+            " gender TEXT,"
+            " grade INTEGER,"
+            " PRIMARY KEY (corpus, speaker));"
+            "CREATE TABLE IF NOT EXISTS utterances ("
+            " corpus TEXT NOT NULL,"
+            " utterance TEXT NOT NULL,"
+            " speaker TEXT NOT NULL,"
+            " paragraph TEXT,"
+            " transcript TEXT,"
+            " path TEXT,"
+            " duration REAL,"
+            " snr REAL,"
+            " snr_reason TEXT,"
+            " PRIMARY KEY (corpus, speaker, utterance));"
+            "CREATE TABLE IF NOT EXISTS sources ("
+            " path TEXT PRIMARY KEY,"
+            " size INTEGER NOT NULL,"
+            " mtime_ns INTEGER NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS speakers_gender_age ON speakers (corpus, gender, age);"
+            "CREATE INDEX IF NOT EXISTS utterances_speaker_snr ON utterances (corpus, speaker, snr);"
+            "CREATE INDEX IF NOT EXISTS utterances_path ON utterances (path);"
+        )
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # --- building ---
+
+    def _changed(self, *paths):
+        """True (and the new stamps recorded) if any source file changed since the last build."""
+        stamps = []
+        for path in paths:
+            full = os.path.abspath(path)
+            st = os.stat(full)
+            stamps.append((full, st.st_size, st.st_mtime_ns))
+        known = [self.conn.execute("SELECT path, size, mtime_ns FROM sources WHERE path = ?",
+                                   (full,)).fetchone() for full, _, _ in stamps]
+        if all(row == stamp for row, stamp in zip(known, stamps)):
+            return False
+        self.conn.executemany("INSERT OR REPLACE INTO sources VALUES (?, ?, ?)", stamps)
+        return True
+
+    def _refresh_audio(self, corpus, audio_root, paths):
+        """
+        Duration and cached SNR of every utterance with a file under
+        audio_root (an SNR already listed, e.g. from the MPS details CSV, is
+        kept when the cache has none).
+        """
+        with WavHeaderIndex(default_index_path(audio_root)) as index:
+            headers = index.headers(paths)
+        cache_path = default_cache_path(audio_root)
+        cache = SNRCache(cache_path) if os.path.exists(cache_path) else None
+        params = snr_params(**SNR_OPTIONS[corpus])
+        rows = []
+        for path in paths:
+            snr, reason = None, None
+            if cache is not None:
+                hit, snr, reason = cache.get(path, params)
+            rows.append((header_duration(headers[path]), snr, reason, os.path.abspath(path), corpus))
+        if cache is not None:
+            cache.close()
+        self.conn.executemany(
+            "UPDATE utterances SET duration = ?, snr = COALESCE(?, snr), snr_reason = ?"
+            " WHERE path = ? AND corpus = ?", rows)
+
+    def add_speech_ocean(self, metadata_dir, wave_root):
+        """Speakers and utterances of Speech Ocean (metadata_dir holds spk2age, spk2gender, text)."""
+        sources = [os.path.join(metadata_dir, name) for name in ("spk2age", "spk2gender", "text")]
+        wavs = {}
+        for path in walk_wavs(wave_root):
+            folder = os.path.basename(os.path.dirname(path))
+            if folder.startswith("SPEAKER"):
+                wavs[folder[len("SPEAKER"):], os.path.splitext(os.path.basename(path))[0]] = path
+
+        with self.conn:
+            existing = dict(self.conn.execute(
+                "SELECT utterance, transcript FROM utterances WHERE corpus = ?", (SPEECH_OCEAN,)))
+            if self._changed(*sources):
+                ages = _read_pairs(sources[0])
+                genders = _read_pairs(sources[1])
+                self.conn.execute("DELETE FROM speakers WHERE corpus = ?", (SPEECH_OCEAN,))
+                self.conn.executemany(
+                    "INSERT INTO speakers VALUES (?, ?, ?, ?, NULL)",
+                    [(SPEECH_OCEAN, spk, int(ages[spk]) if ages.get(spk, "").isdigit() else None,
+                      _normalise_gender(genders.get(spk)))
+                     for spk in sorted(set(ages) | set(genders))])
+                texts = _read_pairs(sources[2])
+            elif {utt for _, utt in wavs} - set(existing):
+                texts = _read_pairs(sources[2])  # new files, transcripts not indexed yet
+            else:
+                texts = existing
+
+            # utterances are the WAVs on disk, with their transcript when there is one
+            self.conn.execute("DELETE FROM utterances WHERE corpus = ?", (SPEECH_OCEAN,))
+            self.conn.executemany(
+                "INSERT INTO utterances (corpus, utterance, speaker, transcript, path)"
+                " VALUES (?, ?, ?, ?, ?)",
+                [(SPEECH_OCEAN, utt, spk, texts.get(utt), os.path.abspath(path))
+                 for (spk, utt), path in sorted(wavs.items())])
+            self._refresh_audio(SPEECH_OCEAN, wave_root, list(wavs.values()))
+
+    def add_mps(self, details_csv, audio_root):
+        """Speakers and utterances of MPS from the complete-details CSV."""
+        wavs = {os.path.splitext(os.path.basename(p))[0]: p for p in walk_wavs(audio_root)}
+        with self.conn:
+            if self._changed(details_csv):
+                with open(details_csv, newline="") as f:
+                    rows = list(csv.DictReader(f))
+                speakers = {}
+                for row in rows:
+                    grade = row.get("grade", "")
+                    speakers[row["speakerID"]] = (_normalise_gender(row.get("gender")),
+                                                  int(grade) if grade.isdigit() else None)
+                self.conn.execute("DELETE FROM speakers WHERE corpus = ?", (MPS,))
+                self.conn.executemany(
+                    "INSERT INTO speakers VALUES (?, ?, NULL, ?, ?)",
+                    [(MPS, spk, gender, grade) for spk, (gender, grade) in sorted(speakers.items())])
+                self.conn.execute("DELETE FROM utterances WHERE corpus = ?", (MPS,))
+                self.conn.executemany(
+                    "INSERT INTO utterances (corpus, utterance, speaker, paragraph, transcript, snr)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    [(MPS, row["audioID"], row["speakerID"], row.get("paragraphID"),
+                      row.get("manualTranscript"), _float_or_none(row.get("SNR_dB"))) for row in rows])
+
+            # file paths can change without the CSV changing
+            utterances = self.query("SELECT speaker, utterance FROM utterances WHERE corpus = ?", (MPS,))
+            self.conn.executemany(
+                "UPDATE utterances SET path = ?, duration = NULL"
+                " WHERE corpus = ? AND speaker = ? AND utterance = ?",
+                [(os.path.abspath(wavs[utt]) if utt in wavs else None, MPS, spk, utt)
+                 for spk, utt in utterances])
+            self._refresh_audio(MPS, audio_root, [wavs[utt] for _, utt in utterances if utt in wavs])
+
+    # --- queries ---
+
+    def query(self, sql, params=()):
+        return self.conn.execute(sql, params).fetchall()
+
+    def speakers(self, corpus, gender=None, age=None, grade=None, min_snr=None, min_count=0):
+        """
+        (speaker, age, gender, grade, n_utterances) for the speakers matching
+        gender ('f'/'m'), an inclusive (min, max) age or grade range, and at
+        least `min_count` utterances with a cached SNR >= min_snr (any
+        utterance when min_snr is None).
+        """
+        where = ["s.corpus = ?"]
+        params = [corpus]
+        if gender is not None:
+            where.append("s.gender = ?")
+            params.append(gender)
+        if age is not None:
+            where.append("s.age BETWEEN ? AND ?")
+            params.extend(age)
+        if grade is not None:
+            where.append("s.grade BETWEEN ? AND ?")
+            params.extend(grade)
+        snr_join = " AND u.snr >= ?" if min_snr is not None else ""
+        join_params = [min_snr] if min_snr is not None else []
+        return self.query(
+            "SELECT s.speaker, s.age, s.gender, s.grade, COUNT(u.utterance) AS n FROM speakers s"
+            " LEFT JOIN utterances u ON u.corpus = s.corpus AND u.speaker = s.speaker" + snr_join +
+            " WHERE " + " AND ".join(where) +
+            " GROUP BY s.speaker HAVING n >= ? ORDER BY s.speaker",
+            join_params + params + [min_count])
+
+    def utterances(self, corpus, speaker=None, min_snr=None):
+        """(utterance, speaker, path, transcript, duration, snr) rows."""
+        where = ["corpus = ?"]
+        params = [corpus]
+        if speaker is not None:
+            where.append("speaker = ?")
+            params.append(speaker)
+        if min_snr is not None:
+            where.append("snr >= ?")
+            params.append(min_snr)
+        return self.query(
+            "SELECT utterance, speaker, path, transcript, duration, snr FROM utterances"
+            " WHERE " + " AND ".join(where) + " ORDER BY speaker, utterance", params)
+
+    def stats(self):
+        return self.query(
+            "SELECT corpus, COUNT(DISTINCT speaker), COUNT(*), COUNT(path), COUNT(snr),"
+            " COALESCE(SUM(duration), 0) / 3600.0 FROM utterances GROUP BY corpus")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build and query the corpus metadata index.")
+    parser.add_argument("db", help="index file, e.g. corpus_index.sqlite")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_ocean = sub.add_parser("add-ocean", help="index Speech Ocean")
+    p_ocean.add_argument("metadata_dir", help="folder with spk2age, spk2gender, text")
+    p_ocean.add_argument("wave_root", help="folder with SPEAKER<id>/ subfolders")
+    p_mps = sub.add_parser("add-mps", help="index MPS")
+    p_mps.add_argument("details_csv", help="MPS_Enhanced_Files_Complete_Details.csv")
+    p_mps.add_argument("audio_root")
+    p_speakers = sub.add_parser("speakers", help="speakers matching the filters")
+    p_speakers.add_argument("--corpus", choices=[SPEECH_OCEAN, MPS], default=SPEECH_OCEAN)
+    p_speakers.add_argument("--gender", choices=["f", "m"])
+    p_speakers.add_argument("--age", type=int, nargs=2, metavar=("MIN", "MAX"))
+    p_speakers.add_argument("--grade", type=int, nargs=2, metavar=("MIN", "MAX"))
+    p_speakers.add_argument("--min-snr", type=float)
+    p_speakers.add_argument("--min-count", type=int, default=0)
+    sub.add_parser("stats", help="counts per corpus")
+    args = parser.parse_args(argv)
+
+    with CorpusIndex(args.db) as index:
+        if args.command == "add-ocean":
+            index.add_speech_ocean(args.metadata_dir, args.wave_root)
+        elif args.command == "add-mps":
+            index.add_mps(args.details_csv, args.audio_root)
+        elif args.command == "speakers":
+            for speaker, age, gender, grade, n in index.speakers(args.corpus, args.gender, args.age,
+                                                                  args.grade, args.min_snr, args.min_count):
+                print(f"{speaker}\tage={age}\tgender={gender}\tgrade={grade}\tutterances={n}")
+        if args.command in ("add-ocean", "add-mps", "stats"):
+            for corpus, n_spk, n_utt, n_files, n_snr, hours in index.stats():
+                print(f"{corpus}: {n_spk} speakers, {n_utt} utterances, {n_files} with audio "
+                      f"({hours:.2f} h), {n_snr} with cached SNR")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
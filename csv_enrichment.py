@@ -0,0 +1,229 @@
+"""
+Add computed audio columns to a speaker CSV, in parallel and resumably.
+
+Takes a speaker metadata CSV (speaker_name, age, gender, audio_file, text,
+... as written by the Speech Ocean selectors) and adds, per row:
+    snr       windowed WADA-SNR (snr_utils.window_snr_result)
+    duration  seconds, from the WAV header
+    f0        f0_mean, f0_median, f0_std (Hz, voiced frames) and
+              voiced_fraction, from the Praat pitch track that
+              F0_Pitch_contour_Saving_Code.py extracts (needs
+              parselmouth, so it is only computed when asked for)
+Columns already in the input (e.g. snr) are overwritten in place; rows
+whose file is missing get NA. A NaN SNR (no usable window) is left empty,
+as the pandas version of the Speech Ocean updater wrote it.
+
+Rows are computed on a process pool and written to the output in input
+order as soon as they are ready, so a crashed or interrupted run leaves a
+valid CSV of the rows finished so far; running again resumes after them.
+Progress is a single counter line instead of a line per row.
+
+Usage:
+    python csv_enrichment.py <speakers.csv> <audio_root> <output.csv> [--columns snr duration [f0]]
+        [--min-duration 0.5] [--workers N] [--no-resume]
+"""
+
+import io
+import os
+import sys
+import csv
+import argparse
+
+import numpy as np
+
+import snr_utils
+from snr_cache import SNRCache, default_cache_path
+from wav_index import header_duration, read_header
+
+COLUMNS = ("snr", "duration", "f0")
+# computed when --columns is not given; f0 is opt-in
+DEFAULT_COLUMNS = ("snr", "duration")
+# output columns each computed column adds
+OUTPUT_COLUMNS = {
+    "snr": ["snr"],
+    "duration": ["duration"],
+    "f0": ["f0_mean", "f0_median", "f0_std", "voiced_fraction"],
+}
+NA = "NA"
+
+
+def f0_summary(f0):
+    """Mean, median and std of the voiced frames of a pitch track (0 = unvoiced), and the voiced share."""
+    f0 = np.asarray(f0, dtype=np.float64)
+    voiced = f0[f0 > 0]
+    if len(voiced) == 0:
+        return [NA, NA, NA, 0.0 if len(f0) else NA]
+    return [round(float(voiced.mean()), 2), round(float(np.median(voiced)), 2),
+            round(float(voiced.std()), 2), round(len(voiced) / len(f0), 4)]
+
+
+def _enrich_task(task):
+    # Values of the requested columns for one file; errors are returned, not raised
+    audio_path, columns, snr_options, known_snr = task
+    values = {}
+    try:
+        if "duration" in columns:
+            duration = header_duration(read_header(audio_path))
+            values["duration"] = [NA if duration is None else round(duration, 3)]
+        if "snr" in columns:
+            if known_snr is not None:
+                snr, _ = known_snr
+            else:
+                snr, reason = snr_utils.window_snr_result(audio_path, **snr_options)
+                values["_snr_result"] = (snr, reason)  # for the parent to cache
+            values["snr"] = [NA if snr is None else "" if np.isnan(snr) else snr]
+        if "f0" in columns:
+            from F0_Pitch_contour_Saving_Code import extract_f0_parselmouth
+            values["f0"] = f0_summary(extract_f0_parselmouth(audio_path))
+    except Exception as e:
+        return values, f"{type(e).__name__}: {e}"
+    return values, None
+
+
+def _resume_point(output_csv, fieldnames, keys):
+    """
+    Number of leading rows of a previous run's output that can be kept
+    (same header, same files in the same order). The kept rows are
+    rewritten so appending can continue.
+    """
+    if not os.path.exists(output_csv):
+        return 0
+    with open(output_csv, newline="") as f:
+        text = f.read()
+    if not text.endswith("\n"):
+        text = text[:text.rfind("\n") + 1]  # drop a half-written last line
+    rows = list(csv.reader(io.StringIO(text, newline="")))
+    if not rows or rows[0] != fieldnames:
+        return 0
+    done = 0
+    for row, key in zip(rows[1:], keys):
+        if row[:len(key)] != key:
+            break
+        done += 1
+    tmp = f"{output_csv}.tmp{os.getpid()}"
+    with open(tmp, "w", newline="") as f:
+        csv.writer(f).writerows(rows[:done + 1])
+    os.replace(tmp, output_csv)
+    return done
+
+
+def enrich_csv(input_csv, audio_root, output_csv, columns=DEFAULT_COLUMNS, workers=1, cache=None,
+               resume=True, chunksize=2, progress=True, **snr_options):
+    """
+    Write input_csv plus the computed `columns` to output_csv; audio files
+    are <audio_root>/<speaker_name>/<audio_file>. Returns (rows written
+    this run, rows resumed, {row number: error}). snr_options go to
+    window_snr_result (e.g. min_duration=0.5, partial_windows=True).
+    """
+    columns = [c for c in COLUMNS if c in columns]
+    if "f0" in columns:
+        import parselmouth  # noqa: F401  (fail here, not once per row in the workers)
+    with open(input_csv, newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        rows = list(reader)
+
+    fieldnames = list(header)
+    positions = {}
+    for name in (c for column in columns for c in OUTPUT_COLUMNS[column]):
+        if name not in fieldnames:
+            fieldnames.append(name)
+        positions[name] = fieldnames.index(name)
+    speaker_i, file_i = header.index("speaker_name"), header.index("audio_file")
+    paths = [os.path.join(audio_root, row[speaker_i], row[file_i]) for row in rows]
+    # the columns that identify a row when resuming: everything before the first computed one
+    n_key = min(positions.values())
+    keys = [(row + [""] * len(fieldnames))[:n_key] for row in rows]
+
+    done = _resume_point(output_csv, fieldnames, keys) if resume else 0
+    params = snr_utils.snr_params(**snr_options)
+
+    def task(path):
+        known = None
+        if cache is not None and "snr" in columns:
+            hit, snr, reason = cache.get(path, params)
+            known = (snr, reason) if hit else None
+        return path, columns, snr_options, known
+
+    todo = [i for i in range(done, len(rows)) if os.path.exists(paths[i])]
+    present = set(todo)
+    tasks = (task(paths[i]) for i in todo)
+    pool = None
+    if workers > 1 and todo:
+        from concurrent.futures import ProcessPoolExecutor
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=snr_utils._init_worker,
+                                   initargs=((snr_utils.db_vals, snr_utils.g_vals),))
+        results = pool.map(_enrich_task, tasks, chunksize=chunksize)
+    else:
+        results = map(_enrich_task, tasks)
+
+    errors = {}
+    written = 0
+    total = len(rows)
+    try:
+        with open(output_csv, "a" if done else "w", newline="") as f:
+            writer = csv.writer(f)
+            if not done:
+                writer.writerow(fieldnames)
+            for i in range(done, total):
+                out = (rows[i] + [""] * len(fieldnames))[:len(fieldnames)]
+                if i in present:
+                    values, error = next(results)
+                    if error is not None:
+                        errors[i + 1] = error
+                    if cache is not None and "_snr_result" in values:
+                        cache.put(paths[i], params, *values["_snr_result"])
+                else:
+                    values, errors[i + 1] = {}, f"missing file: {paths[i]}"
+                for column in columns:
+                    for name, value in zip(OUTPUT_COLUMNS[column],
+                                           values.get(column, [NA] * len(OUTPUT_COLUMNS[column]))):
+                        out[positions[name]] = value
+                writer.writerow(out)
+                f.flush()
+                written += 1
+                if progress:
+                    print(f"\r[{i + 1}/{total}] rows enriched", end="", file=sys.stderr, flush=True)
+    finally:
+        if progress and written:
+            print(file=sys.stderr)
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+    return written, done, errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Add SNR / duration / F0 columns to a speaker CSV.")
+    parser.add_argument("input_csv")
+    parser.add_argument("audio_root", help="folder with <speaker_name>/<audio_file>")
+    parser.add_argument("output_csv")
+    parser.add_argument("--columns", nargs="+", choices=COLUMNS, default=list(DEFAULT_COLUMNS),
+                        help="columns to compute (default: snr duration; f0 needs parselmouth)")
+    parser.add_argument("--min-duration", type=float, default=0.5,
+                        help="SNR minimum duration (s): 0.5 for Speech Ocean, 6.0 for MPS")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--no-cache", action="store_true", help="do not use <audio_root>/.snr_cache.sqlite")
+    parser.add_argument("--no-resume", action="store_true", help="start over instead of resuming")
+    args = parser.parse_args(argv)
+    if "f0" in args.columns:
+        try:
+            import parselmouth  # noqa: F401
+        except ImportError:
+            parser.error("--columns f0 needs parselmouth (pip install praat-parselmouth)")
+
+    cache = None if args.no_cache else SNRCache(default_cache_path(args.audio_root))
+    try:
+        written, resumed, errors = enrich_csv(args.input_csv, args.audio_root, args.output_csv, args.columns,
+                                              args.workers, cache, not args.no_resume,
+                                              min_duration=args.min_duration, partial_windows=True)
+    finally:
+        if cache is not None:
+            cache.close()
+    for row, error in sorted(errors.items()):
+        print(f"row {row}: {error}")
+    print(f"✅ {written} rows written ({resumed} kept from the previous run) -> {args.output_csv}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,195 @@
+"""
+Parallel, idempotent materialisation of a dataset tree from a manifest.
+
+Every (source, target) pair is produced on a thread pool in one of four
+modes:
+    copy      full copy with metadata (shutil.copy2)
+    hardlink  second name for the same inode, no extra disk (same filesystem)
+    symlink   link to the absolute source path
+    reflink   copy-on-write clone (Linux FICLONE: Btrfs, XFS, ...), no extra
+              disk until either side is modified
+A hardlink or reflink that the filesystem refuses falls back to a copy
+(recorded as such in the output manifest).
+
+A target that is already identical to its source is skipped: the same
+inode (hardlink), a link to the source (symlink), or the same size and
+mtime (copy / reflink, both keep the source mtime) - or, with
+verify="hash", the same SHA-1. Files are written under a temporary name
+and renamed into place, so an interrupted run never leaves a partial
+file. Re-creating an unchanged tree therefore only stats each file.
+
+Usage:
+    python materialise.py <manifest.csv> <target_root> [--mode copy|hardlink|symlink|reflink]
+        [--source-root DIR] [--verify stat|hash] [--workers 8] [--output-manifest CSV]
+The input manifest needs a `path` column (e.g. a stratified_sampler.py
+manifest); targets keep each file's speaker folder
+(<target_root>/<parent folder>/<file>), or its path relative to
+--source-root when given.
+"""
+
+import os
+import sys
+import csv
+import errno
+import shutil
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+from snr_cache import file_sha1
+
+MODES = ("copy", "hardlink", "symlink", "reflink")
+MANIFEST_FILENAME = "materialised_manifest.csv"
+MANIFEST_COLUMNS = ["source", "target", "mode", "action", "size", "detail"]
+_ACTIONS = {"copy": "copied", "hardlink": "hardlinked", "symlink": "symlinked", "reflink": "reflinked"}
+
+FICLONE = 0x40049409  # linux/fs.h _IOW(0x94, 9, int)
+# errors meaning "this filesystem / pair cannot do that", not "this file is broken"
+_UNSUPPORTED = {errno.EXDEV, errno.EPERM, errno.EOPNOTSUPP, errno.ENOTSUP, errno.EINVAL, errno.ENOTTY,
+                errno.EMLINK}
+
+
+def _reflink(source, target):
+    try:
+        import fcntl
+    except ImportError:  # not available on Windows
+        raise OSError(errno.ENOTSUP, "reflinks need fcntl") from None
+    with open(source, "rb") as src, open(target, "wb") as dst:
+        fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+    shutil.copystat(source, target)
+
+
+def is_identical(source, target, mode="copy", verify="stat"):
+    """True if `target` already holds what materialising `source` in `mode` would produce."""
+    if mode == "symlink":
+        return os.path.islink(target) and os.readlink(target) == os.path.abspath(source)
+    if os.path.islink(target) or not os.path.isfile(target):
+        return False
+    if mode == "hardlink":
+        return os.path.samefile(source, target)
+    src, dst = os.stat(source), os.stat(target)
+    if src.st_size != dst.st_size:
+        return False
+    if verify == "hash":
+        return file_sha1(source) == file_sha1(target)
+    return src.st_mtime_ns == dst.st_mtime_ns
+
+
+def materialise_file(source, target, mode="copy", verify="stat"):
+    """
+    Produce one target; returns (action, detail) with action one of
+    skipped, copied, hardlinked, symlinked, reflinked, missing, error.
+    """
+    if mode not in MODES:
+        raise ValueError(f"mode must be one of {MODES}, not {mode!r}")
+    if not os.path.isfile(source):
+        return "missing", "source not found"
+    tmp = os.path.join(os.path.dirname(target), f".{os.path.basename(target)}.tmp{os.getpid()}")
+    try:
+        if os.path.lexists(target) and is_identical(source, target, mode, verify):
+            return "skipped", ""
+        action, detail = _ACTIONS[mode], ""
+        try:
+            if mode == "symlink":
+                os.symlink(os.path.abspath(source), tmp)
+            elif mode == "hardlink":
+                os.link(source, tmp)
+            elif mode == "reflink":
+                _reflink(source, tmp)
+            else:
+                shutil.copy2(source, tmp)
+        except OSError as e:
+            if mode not in ("hardlink", "reflink") or e.errno not in _UNSUPPORTED:
+                raise
+            # e.g. a hardlink across filesystems, or no reflink support
+            if os.path.lexists(tmp):
+                os.remove(tmp)
+            shutil.copy2(source, tmp)
+            action, detail = "copied", f"{mode} not possible: {e}"
+        os.replace(tmp, target)
+        return action, detail
+    except OSError as e:
+        if os.path.lexists(tmp):
+            os.remove(tmp)
+        return "error", f"{type(e).__name__}: {e}"
+
+
+def materialise(pairs, mode="copy", verify="stat", workers=8, manifest_path=None):
+    """
+    Produce every (source, target) pair on a pool of `workers` threads
+    (file copying is I/O bound and releases the GIL). Target folders are
+    created first. Returns one dict per pair, in input order, with
+    MANIFEST_COLUMNS; it is also written to manifest_path when given.
+    """
+    pairs = [(str(source), str(target)) for source, target in pairs]
+    for folder in sorted({os.path.dirname(os.path.abspath(target)) for _, target in pairs}):
+        os.makedirs(folder, exist_ok=True)
+
+    def run(pair):
+        return materialise_file(pair[0], pair[1], mode, verify)
+
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            outcomes = list(pool.map(run, pairs))
+    else:
+        outcomes = [run(pair) for pair in pairs]
+
+    results = []
+    for (source, target), (action, detail) in zip(pairs, outcomes):
+        size = os.path.getsize(source) if action not in ("missing", "error") else ""
+        results.append({"source": source, "target": target, "mode": mode, "action": action,
+                        "size": size, "detail": detail})
+    if manifest_path is not None:
+        write_manifest(results, manifest_path)
+    return results
+
+
+def write_manifest(results, manifest_path):
+    tmp = f"{manifest_path}.tmp{os.getpid()}"
+    with open(tmp, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=MANIFEST_COLUMNS)
+        writer.writeheader()
+        writer.writerows(results)
+    os.replace(tmp, manifest_path)
+
+
+def summary(results):
+    """'12 copied, 300 skipped, 1 missing' style one-liner."""
+    counts = {}
+    for result in results:
+        counts[result["action"]] = counts.get(result["action"], 0) + 1
+    return ", ".join(f"{n} {action}" for action, n in sorted(counts.items())) or "nothing to do"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build a dataset tree from a manifest of source files.")
+    parser.add_argument("manifest", help="CSV with a `path` column")
+    parser.add_argument("target_root")
+    parser.add_argument("--mode", choices=MODES, default="copy")
+    parser.add_argument("--source-root", help="keep paths relative to this folder")
+    parser.add_argument("--verify", choices=["stat", "hash"], default="stat",
+                        help="how an existing copy is recognised as identical")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--output-manifest", help=f"default: <target_root>/{MANIFEST_FILENAME}")
+    args = parser.parse_args(argv)
+
+    with open(args.manifest, newline="") as f:
+        sources = [row["path"] for row in csv.DictReader(f)]
+    pairs = []
+    for source in sources:
+        if args.source_root:
+            rel = os.path.relpath(source, args.source_root)
+        else:
+            rel = os.path.join(os.path.basename(os.path.dirname(source)), os.path.basename(source))
+        pairs.append((source, os.path.join(args.target_root, rel)))
+
+    results = materialise(pairs, args.mode, args.verify, args.workers,
+                          args.output_manifest or os.path.join(args.target_root, MANIFEST_FILENAME))
+    for result in results:
+        if result["action"] in ("missing", "error"):
+            print(f"{result['action']}: {result['source']} ({result['detail']})")
+    print(summary(results))
+    return 1 if any(result["action"] == "error" for result in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
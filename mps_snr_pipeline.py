@@ -0,0 +1,190 @@
+"""
+Single-pass MPS SNR pipeline: score -> CSV + shortlist copy + histogram.
+
+The three step scripts talk through CSVs: 1._1 scores every file and
+writes MPS_SNR_Results.csv, 1._2 re-reads it to copy the files at
+>= 15 dB, and 1._3 re-reads a CSV to plot the SNR distribution. Here the
+corpus is walked once and every result, as it comes out of
+map_window_snr (in walk order, scored on a process pool), is
+    - written to the CSV (same SpeakerID, Filename, SNR_dB columns as 1._1),
+    - handed to a copy thread pool when it passes the threshold, so the
+      dataset copy runs while scoring continues (materialise.py, identical
+      targets skipped), and
+    - added to a 5 dB histogram accumulator,
+and the plot (same bins and look as 1._3) is drawn from the accumulator
+at the end.
+
+Usage:
+    python mps_snr_pipeline.py <mps_root> <target_root> [--csv MPS_SNR_Results.csv]
+        [--plot SNR_Distribution.png] [--threshold 15] [--workers N] [--copy-workers 8]
+        [--mode copy|hardlink|symlink|reflink]
+"""
+
+import os
+import sys
+import csv
+import math
+import argparse
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from materialise import MANIFEST_FILENAME, MODES, materialise_file, summary, write_manifest
+from snr_cache import SNRCache, default_cache_path
+from snr_utils import header_skip_reason, map_window_snr
+from wav_index import WavHeaderIndex, default_index_path, header_duration, walk_wavs
+
+
+class SNRHistogram:
+    """
+    Counts of SNR values in `width` dB bins, filled one value at a time.
+    bins()/counts() give what np.histogram(values, np.arange(0, max + width,
+    width)) gives for all values added (the binning 1._3 plots): values
+    below 0 are left out and the last bin includes its right edge. NaN
+    (a file whose kept windows are all digital silence) and inf are
+    counted in `total`, as 1._3 counts every CSV row, and in `non_finite`,
+    but not binned.
+    """
+
+    def __init__(self, width=5.0):
+        self.width = width
+        self.by_bin = {}  # bin number -> count
+        self.total = 0
+        self.below = 0  # values < 0, outside the plotted range
+        self.non_finite = 0
+        self.max = None  # of the finite values
+
+    def add(self, snr):
+        self.total += 1
+        if not math.isfinite(snr):
+            self.non_finite += 1
+            return
+        self.max = snr if self.max is None else max(self.max, snr)
+        if snr < 0:
+            self.below += 1
+            return
+        k = math.floor(snr / self.width)
+        self.by_bin[k] = self.by_bin.get(k, 0) + 1
+
+    def bins(self):
+        return np.arange(0, self.max + self.width, self.width)
+
+    def counts(self):
+        n_bins = len(self.bins()) - 1
+        counts = np.zeros(max(n_bins, 0), dtype=np.int64)
+        for k, n in self.by_bin.items():
+            if k < n_bins:
+                counts[k] += n
+            elif k == n_bins and n_bins > 0:
+                counts[-1] += n  # the maximum, exactly on the last edge: closed last bin
+        return counts
+
+
+def plot_histogram(histogram, output_path, title="Distribution of SNR Values for MPS Dataset"):
+    """The 1._3 bar plot, drawn from accumulated counts."""
+    import matplotlib.pyplot as plt
+
+    bins, counts = histogram.bins(), histogram.counts()
+    plt.figure(figsize=(10, 6))
+    patches = plt.bar(bins[:-1], counts, width=np.diff(bins), align='edge', edgecolor='black', alpha=0.7)
+    for count, patch in zip(counts, patches):
+        if count > 0:
+            plt.text(patch.get_x() + patch.get_width() / 2, count + 0.5, int(count),
+                     ha='center', va='bottom', fontsize=10, fontweight='bold')
+    plt.title(f'{title} (Total: {histogram.total} Samples)', fontsize=14)
+    plt.xlabel('SNR (dB)', fontsize=12)
+    plt.ylabel('Number of Samples', fontsize=12)
+    plt.grid(True, linestyle='--', alpha=0.6)
+    plt.tight_layout()
+    plt.savefig(output_path)
+    plt.close()
+
+
+def run_pipeline(mps_root, target_root, output_csv, plot_path=None, threshold=15.0, workers=1,
+                 copy_workers=8, mode="copy", cache=None):
+    """
+    Score every .wav under mps_root once; returns (histogram, copy results).
+    Targets are <target_root>/<speaker folder>/<file>, as in 1._2.
+    """
+    file_paths = list(walk_wavs(mps_root))
+    with WavHeaderIndex(default_index_path(mps_root)) as index:
+        headers = index.headers(file_paths)
+    header_skips = {p: header_skip_reason(headers[p]) for p in file_paths}
+    to_score = [p for p in file_paths if header_skips[p] is None]
+    durations = {p: header_duration(headers[p]) or 0.0 for p in to_score}
+
+    histogram = SNRHistogram()
+    copies = []  # (source, target, future)
+    created = set()
+    total = len(file_paths)
+    with open(output_csv, mode='w', newline='') as f, ThreadPoolExecutor(max_workers=copy_workers) as copier:
+        writer = csv.writer(f)
+        writer.writerow(["SpeakerID", "Filename", "SNR_dB"])
+        scored = map_window_snr(to_score, workers=workers, cache=cache, durations=durations)
+        for i, file_path in enumerate(file_paths, start=1):
+            if header_skips[file_path] is not None:
+                snr_value, reason, error = None, header_skips[file_path], None
+            else:
+                _, snr_value, reason, error = next(scored)
+            speaker_id = Path(file_path).parent.name
+            fname = os.path.basename(file_path)
+            if error is not None:
+                print(f"[{i}/{total}] Error processing {file_path}: {error}")
+                continue
+            if snr_value is None:
+                print(f"[{i}/{total}] {speaker_id}/{fname} skipped ({reason})")
+                continue
+
+            writer.writerow([speaker_id, fname, snr_value])
+            histogram.add(snr_value)
+            print(f"[{i}/{total}] {speaker_id}/{fname} → SNR: {snr_value} dB")
+            if snr_value >= threshold:
+                target_folder = os.path.join(target_root, speaker_id)
+                if target_folder not in created:
+                    os.makedirs(target_folder, exist_ok=True)
+                    created.add(target_folder)
+                target = os.path.join(target_folder, fname)
+                copies.append((file_path, target, copier.submit(materialise_file, file_path, target, mode)))
+
+    results = []
+    for source, target, future in copies:
+        action, detail = future.result()
+        results.append({"source": source, "target": target, "mode": mode, "action": action,
+                        "size": os.path.getsize(source) if action != "error" else "", "detail": detail})
+        if action == "error":
+            print(f"Error copying {source}: {detail}")
+    os.makedirs(target_root, exist_ok=True)
+    write_manifest(results, os.path.join(target_root, MANIFEST_FILENAME))
+
+    if plot_path is not None and histogram.max is not None:
+        plot_histogram(histogram, plot_path)
+    return histogram, results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score, shortlist, copy and plot MPS SNR in one pass.")
+    parser.add_argument("mps_root")
+    parser.add_argument("target_root", help="shortlisted dataset, e.g. Final_MPS_Dataset_EAAI")
+    parser.add_argument("--csv", default="MPS_SNR_Results.csv", help="SNR of every scored file")
+    parser.add_argument("--plot", default="SNR_Distribution_Plot_Code.png", help="histogram PNG")
+    parser.add_argument("--threshold", type=float, default=15.0, help="copy files with SNR >= this (dB)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="SNR worker processes")
+    parser.add_argument("--copy-workers", type=int, default=8, help="copy threads")
+    parser.add_argument("--mode", choices=MODES, default="copy")
+    args = parser.parse_args(argv)
+
+    with SNRCache(default_cache_path(args.mps_root)) as cache:
+        histogram, results = run_pipeline(args.mps_root, args.target_root, args.csv, args.plot,
+                                          args.threshold, args.workers, args.copy_workers, args.mode, cache)
+    print(f"\n✅ Done. {histogram.total} files scored -> {args.csv}")
+    print(f"{args.target_root}: {summary(results)}")
+    if histogram.non_finite:
+        print(f"{histogram.non_finite} files with a NaN SNR are in the CSV but not in the plot")
+    if histogram.max is not None:
+        print(f"SNR distribution plot saved to: {args.plot}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
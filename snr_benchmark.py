@@ -0,0 +1,307 @@
+"""
+Offline speed / accuracy benchmark for the WADA-SNR implementations.
+
+Speech-like signals (a jittered glottal pulse train through formant
+resonators, with syllable-rate envelopes and pauses) are mixed with white
+or babble noise at known SNRs and written as 16-bit WAVs to a temporary
+directory, at Speech Ocean (short utterance) and MPS (~60 s) durations.
+Every implementation is then timed on the same files and its estimates are
+compared with the SNR the files were mixed at, and with the first
+implementation measured (the legacy per-hop loop by default). No real data
+is needed.
+
+Usage:
+    python snr_benchmark.py --output snr_benchmark.json
+    python snr_benchmark.py --quick
+"""
+
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import tracemalloc
+import subprocess
+
+import numpy as np
+import soundfile as sf
+import scipy.signal
+
+import snr_utils
+
+SAMPLE_RATE = 16000
+# Formant centre frequencies / bandwidths (Hz) of a few vowels
+VOWELS = [
+    [(730, 90), (1090, 110), (2440, 170)],
+    [(270, 60), (2290, 100), (3010, 150)],
+    [(300, 60), (870, 90), (2240, 150)],
+    [(530, 70), (1840, 100), (2480, 160)],
+    [(640, 80), (1190, 100), (2390, 160)],
+]
+
+# Duration classes: seconds range and the window_snr options the real
+# scripts use for that corpus
+CORPORA = {
+    "speech_ocean": {"duration": (1.5, 5.0), "options": {"min_duration": 0.5, "partial_windows": True}},
+    "mps": {"duration": (55.0, 62.0), "options": {}},
+}
+
+
+# --- Synthetic corpus ---
+
+def speech_like(duration, rng, sample_rate=SAMPLE_RATE):
+    """A voiced, syllabic, speech-like signal with pauses, peak near 0.5."""
+    n = int(duration * sample_rate)
+    out = np.zeros(n)
+    position = 0
+    base_f0 = rng.uniform(110, 320)
+    while position < n:
+        syllable = int(rng.uniform(0.12, 0.35) * sample_rate)
+        pause = int(rng.exponential(0.12) * sample_rate) if rng.random() < 0.7 else 0
+        length = min(syllable, n - position)
+
+        # glottal pulse train with a drifting, jittered f0
+        f0 = base_f0 * (1 + 0.1 * np.sin(np.linspace(0, rng.uniform(1, 3), length)))
+        f0 *= 1 + 0.01 * rng.standard_normal(length)
+        phase = np.cumsum(f0 / sample_rate)
+        source = np.diff(np.floor(phase), prepend=0.0)
+        source = scipy.signal.lfilter([1.0], [1.0, -0.97], source)
+
+        # vocal tract: cascade of formant resonators
+        voiced = source
+        for freq, bandwidth in VOWELS[rng.integers(len(VOWELS))]:
+            r = np.exp(-np.pi * bandwidth / sample_rate)
+            theta = 2 * np.pi * freq / sample_rate
+            voiced = scipy.signal.lfilter([1 - r], [1, -2 * r * np.cos(theta), r * r], voiced)
+        # lip radiation (first difference) also removes the pulse train's DC
+        voiced = np.diff(voiced, prepend=voiced[0])
+
+        envelope = np.hanning(length) ** 0.5
+        out[position:position + length] = voiced * envelope * rng.uniform(0.5, 1.0)
+        position += length + pause
+
+    peak = np.max(np.abs(out))
+    return out / peak * 0.5 if peak > 0 else out
+
+
+def noise(kind, n, rng, sample_rate=SAMPLE_RATE):
+    if kind == "white":
+        return rng.standard_normal(n)
+    if kind == "babble":
+        talkers = [speech_like(n / sample_rate + 0.01, rng, sample_rate)[:n] for _ in range(6)]
+        return np.sum(talkers, axis=0)
+    raise ValueError(f"unknown noise type {kind!r}")
+
+
+def mix_at_snr(clean, noise_signal, snr_db):
+    """clean + noise scaled to the requested SNR, peak-limited to fit in 16 bits."""
+    p_clean = np.mean(clean**2)
+    p_noise = np.mean(noise_signal**2)
+    mixed = clean + noise_signal * np.sqrt(p_clean / (p_noise * 10 ** (snr_db / 10)))
+    peak = np.max(np.abs(mixed))
+    return mixed * (0.9 / peak) if peak > 0.9 else mixed
+
+
+def make_corpus(directory, snrs, noise_types, files_per_snr, seed=0):
+    """Write the synthetic WAVs; returns [{path, corpus, noise, snr_db, duration}]."""
+    rng = np.random.default_rng(seed)
+    items = []
+    for corpus, spec in CORPORA.items():
+        for kind in noise_types:
+            for snr_db in snrs:
+                for i in range(files_per_snr):
+                    duration = rng.uniform(*spec["duration"])
+                    clean = speech_like(duration, rng)
+                    mixed = mix_at_snr(clean, noise(kind, len(clean), rng), snr_db)
+                    path = os.path.join(directory, f"{corpus}_{kind}_{snr_db:+d}dB_{i}.wav")
+                    sf.write(path, mixed, SAMPLE_RATE, subtype="PCM_16")
+                    items.append({"path": path, "corpus": corpus, "noise": kind,
+                                  "snr_db": snr_db, "duration": len(clean) / SAMPLE_RATE})
+    return items
+
+
+# --- Implementations under test ---
+
+def legacy_window_snr(audio_path, window=6.0, hop=1.0, min_duration=7.0, partial_windows=False):
+    """
+    The original per-hop loop: every window re-opened and decoded from disk
+    (soundfile standing in for librosa.load), scored with the scalar
+    wada_snr.
+    """
+    info = sf.info(audio_path)
+    duration = info.frames / info.samplerate
+    audio, _ = sf.read(audio_path)
+    if not snr_utils.complete_silence_check(audio) or duration < min_duration:
+        return None
+    n_windows = int(duration / hop) if partial_windows else int((duration - window) / hop) + 1
+    snr_list = []
+    for j in range(n_windows):
+        a, _ = sf.read(audio_path, start=int(j * hop * info.samplerate),
+                       frames=int(window * info.samplerate), dtype="float32")
+        snr_list.append(snr_utils.wada_snr(a))
+    return snr_utils._average_snr(snr_list)
+
+
+def float32_batch_window_snr(audio_path, window=6.0, hop=1.0, min_duration=7.0, partial_windows=False):
+    """One float32 decode, every window scored by wada_snr_batch."""
+    audio, sample_rate = sf.read(audio_path, dtype="float32")
+    if not snr_utils.complete_silence_check(audio) or len(audio) / sample_rate < min_duration:
+        return None
+    return snr_utils._average_snr(
+        snr_utils.windowed_snr(snr_utils.to_mono(audio), sample_rate, window, hop, partial_windows))
+
+
+def int16_window_snr(audio_path, **options):
+    """The default path: memory-mapped int16, in-place float32 kernels."""
+    return snr_utils.window_snr_result(audio_path, **options)[0]
+
+
+def incremental_window_snr(audio_path, **options):
+    return snr_utils.window_snr_result(audio_path, incremental=True, **options)[0]
+
+
+def streaming_window_snr(audio_path, **options):
+    return snr_utils.window_snr_result(audio_path, streaming=True, **options)[0]
+
+
+IMPLEMENTATIONS = {
+    "legacy_per_hop": legacy_window_snr,
+    "float32_batch": float32_batch_window_snr,
+    "int16_inplace": int16_window_snr,
+    "incremental": incremental_window_snr,
+    "streaming": streaming_window_snr,
+}
+
+
+# --- Measurement ---
+
+def _time_run(func, items):
+    estimates = []
+    start = time.perf_counter()
+    for item in items:
+        estimates.append(func(item["path"], **CORPORA[item["corpus"]]["options"]))
+    return time.perf_counter() - start, estimates
+
+
+def _peak_memory(func, items):
+    # Largest Python/NumPy allocation peak over single files (tracemalloc is
+    # off during timing, it slows allocation-heavy code down)
+    peak = 0
+    for item in items:
+        tracemalloc.start()
+        func(item["path"], **CORPORA[item["corpus"]]["options"])
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return peak
+
+
+def _accuracy(items, estimates):
+    rows = []
+    keys = sorted({(item["noise"], item["snr_db"]) for item in items})
+    for kind, snr_db in keys:
+        errors = [est - item["snr_db"] for item, est in zip(items, estimates)
+                  if item["noise"] == kind and item["snr_db"] == snr_db and est is not None]
+        rows.append({
+            "noise": kind,
+            "true_snr_db": snr_db,
+            "n": len(errors),
+            "bias_db": float(np.mean(errors)) if errors else None,
+            "mae_db": float(np.mean(np.abs(errors))) if errors else None,
+        })
+    return rows
+
+
+def _max_difference(reference, estimates):
+    # File averages of one implementation against the first one measured
+    diffs = [abs(a - b) for a, b in zip(reference, estimates) if a is not None and b is not None]
+    mismatched = sum((a is None) != (b is None) for a, b in zip(reference, estimates))
+    return None if mismatched else float(max(diffs, default=0.0))
+
+
+def _git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run_benchmark(snrs=range(-10, 61, 10), noise_types=("white", "babble"), files_per_snr=2,
+                  implementations=None, seed=0, repeats=1):
+    implementations = implementations or list(IMPLEMENTATIONS)
+    with tempfile.TemporaryDirectory() as directory:
+        items = make_corpus(directory, list(snrs), noise_types, files_per_snr, seed)
+        results = []
+        for corpus in CORPORA:
+            corpus_items = [item for item in items if item["corpus"] == corpus]
+            audio_seconds = sum(item["duration"] for item in corpus_items)
+            reference = None
+            for name in implementations:
+                func = IMPLEMENTATIONS[name]
+                _time_run(func, corpus_items[:1])  # warm the page cache and imports
+                elapsed = min(_time_run(func, corpus_items)[0] for _ in range(repeats))
+                _, estimates = _time_run(func, corpus_items)
+                if reference is None:
+                    reference = (name, estimates)
+                results.append({
+                    "implementation": name,
+                    "corpus": corpus,
+                    "files": len(corpus_items),
+                    "audio_seconds": audio_seconds,
+                    "seconds": elapsed,
+                    "files_per_second": len(corpus_items) / elapsed,
+                    "audio_seconds_per_second": audio_seconds / elapsed,
+                    "peak_memory_bytes": _peak_memory(func, corpus_items),
+                    "accuracy": _accuracy(corpus_items, estimates),
+                    "reference": reference[0],
+                    "max_abs_diff_from_reference_db": _max_difference(reference[1], estimates),
+                })
+                print(f"{corpus:13s} {name:16s} {len(corpus_items) / elapsed:8.2f} files/s "
+                      f"{audio_seconds / elapsed:10.1f} audio-s/s")
+    return {
+        "meta": {
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "config": {
+            "snrs_db": list(snrs),
+            "noise_types": list(noise_types),
+            "files_per_snr": files_per_snr,
+            "seed": seed,
+            "repeats": repeats,
+            "corpora": {name: {"duration_s": spec["duration"], "options": spec["options"]}
+                        for name, spec in CORPORA.items()},
+        },
+        "results": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark WADA-SNR implementations on synthetic audio.")
+    parser.add_argument("--output", default="snr_benchmark.json", help="JSON results file")
+    parser.add_argument("--files-per-snr", type=int, default=2)
+    parser.add_argument("--snrs", type=int, nargs="+", default=list(range(-10, 61, 10)))
+    parser.add_argument("--noise", nargs="+", default=["white", "babble"], choices=["white", "babble"])
+    parser.add_argument("--implementations", nargs="+", choices=list(IMPLEMENTATIONS))
+    parser.add_argument("--repeats", type=int, default=1, help="timing runs per implementation (best is kept)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--quick", action="store_true", help="one file per SNR, white noise only")
+    args = parser.parse_args(argv)
+
+    if args.quick:
+        args.files_per_snr, args.noise = 1, ["white"]
+    report = run_benchmark(args.snrs, args.noise, args.files_per_snr, args.implementations,
+                           args.seed, args.repeats)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,220 @@
+"""
+Persistent WADA-SNR result cache.
+
+Results are stored in an SQLite file (by default `.snr_cache.sqlite` in the
+dataset root) keyed by the file path plus the SNR parameters (window, hop,
+min_duration, partial windows, first-window rule, method). An entry is only
+used while the file still has the size and mtime it had when it was scored,
+or, with use_hash=True, the same SHA-1 of its contents. The value is the
+rounded average SNR, or the reason the file was skipped. SQLite stores a
+NaN REAL as NULL, so a NaN average (every kept window digital silence) is
+recorded as the NAN_SNR reason and read back as float('nan').
+
+Usage:
+    python snr_cache.py <cache.sqlite> stats
+    python snr_cache.py <cache.sqlite> list [--prefix PATH]
+    python snr_cache.py <cache.sqlite> invalidate [--prefix PATH | --stale | --all]
+    python snr_cache.py <cache.sqlite> compact
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import hashlib
+import sqlite3
+import argparse
+
+CACHE_FILENAME = ".snr_cache.sqlite"
+# `reason` of an entry whose SNR is NaN
+NAN_SNR = "nan snr"
+
+
+def default_cache_path(dataset_root):
+    return os.path.join(dataset_root, CACHE_FILENAME)
+
+
+def file_sha1(path, blocksize=1 << 20):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(blocksize), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def params_key(params):
+    return json.dumps(params, sort_keys=True)
+
+
+class SNRCache:
+    def __init__(self, db_path, use_hash=False):
+        self.db_path = db_path
+        self.use_hash = use_hash
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS snr ("
+            " path TEXT NOT NULL,"
+            " params TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " mtime_ns INTEGER NOT NULL,"
+            " sha1 TEXT,"
+            " snr REAL,"
+            " reason TEXT,"
+            " computed_at REAL NOT NULL,"
+            " PRIMARY KEY (path, params))"
+        )
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def get(self, audio_path, params):
+        """(True, snr, reason) for a valid entry, (False, None, None) otherwise."""
+        path = os.path.abspath(audio_path)
+        row = self.conn.execute(
+            "SELECT size, mtime_ns, sha1, snr, reason FROM snr WHERE path = ? AND params = ?",
+            (path, params_key(params)),
+        ).fetchone()
+        if row is None:
+            return False, None, None
+        size, mtime_ns, sha1, snr, reason = row
+        if snr is None and reason is None:
+            return False, None, None  # a NaN stored before NAN_SNR existed
+        try:
+            st = os.stat(path)
+        except OSError:
+            return False, None, None
+        if st.st_size != size:
+            return False, None, None
+        if self.use_hash:
+            if sha1 is None or file_sha1(path) != sha1:
+                return False, None, None
+        elif st.st_mtime_ns != mtime_ns:
+            return False, None, None
+        if reason == NAN_SNR:
+            return True, float("nan"), None
+        return True, snr, reason
+
+    def put(self, audio_path, params, snr, reason=None):
+        path = os.path.abspath(audio_path)
+        st = os.stat(path)
+        sha1 = file_sha1(path) if self.use_hash else None
+        if snr is not None and math.isnan(snr):
+            snr, reason = None, NAN_SNR
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO snr VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (path, params_key(params), st.st_size, st.st_mtime_ns, sha1,
+                 None if snr is None else float(snr), reason, time.time()),
+            )
+
+    # --- maintenance ---
+
+    @staticmethod
+    def _under(prefix):
+        prefix = os.path.abspath(prefix)
+        if os.path.isdir(prefix):
+            prefix = os.path.join(prefix, "")
+        escaped = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        return " WHERE path LIKE ? ESCAPE '\\'", (escaped + "%",)
+
+    def entries(self, prefix=None):
+        query = "SELECT path, params, snr, reason, computed_at FROM snr"
+        where, args = self._under(prefix) if prefix is not None else ("", ())
+        return [(path, params, float("nan"), None, computed_at) if reason == NAN_SNR
+                else (path, params, snr, reason, computed_at)
+                for path, params, snr, reason, computed_at
+                in self.conn.execute(query + where + " ORDER BY path", args)]
+
+    def stats(self):
+        total, scored, skipped = self.conn.execute(
+            "SELECT COUNT(*), COUNT(CASE WHEN snr IS NOT NULL OR reason = ? THEN 1 END),"
+            " COUNT(CASE WHEN reason != ? THEN 1 END) FROM snr", (NAN_SNR, NAN_SNR)
+        ).fetchone()
+        n_params = self.conn.execute("SELECT COUNT(DISTINCT params) FROM snr").fetchone()[0]
+        return {
+            "entries": total,
+            "scored": scored,
+            "skipped": skipped,
+            "parameter_sets": n_params,
+            "stale": len(self.stale_paths()),
+            "db_bytes": os.path.getsize(self.db_path),
+        }
+
+    def stale_paths(self):
+        """Entries whose file is gone or whose size/mtime no longer match."""
+        stale = []
+        for path, size, mtime_ns in self.conn.execute("SELECT path, size, mtime_ns FROM snr"):
+            try:
+                st = os.stat(path)
+            except OSError:
+                stale.append(path)
+                continue
+            if st.st_size != size or (not self.use_hash and st.st_mtime_ns != mtime_ns):
+                stale.append(path)
+        return stale
+
+    def invalidate(self, prefix=None, stale=False):
+        """Delete entries under `prefix`, stale entries, or (neither given) everything."""
+        with self.conn:
+            if stale:
+                paths = self.stale_paths()
+                before = self.conn.total_changes
+                self.conn.executemany("DELETE FROM snr WHERE path = ?", [(p,) for p in paths])
+                return self.conn.total_changes - before
+            if prefix is not None:
+                where, args = self._under(prefix)
+                return self.conn.execute("DELETE FROM snr" + where, args).rowcount
+            return self.conn.execute("DELETE FROM snr").rowcount
+
+    def compact(self):
+        """Drop stale entries and reclaim the space."""
+        removed = self.invalidate(stale=True)
+        self.conn.execute("VACUUM")
+        return removed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect and maintain a WADA-SNR result cache.")
+    parser.add_argument("db", help="cache file, e.g. <dataset_root>/" + CACHE_FILENAME)
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("stats", help="entry counts and size")
+    p_list = sub.add_parser("list", help="print cached results")
+    p_list.add_argument("--prefix", help="only paths under this directory")
+    p_inv = sub.add_parser("invalidate", help="delete entries")
+    group = p_inv.add_mutually_exclusive_group(required=True)
+    group.add_argument("--prefix", help="paths under this directory")
+    group.add_argument("--stale", action="store_true", help="files that changed or disappeared")
+    group.add_argument("--all", action="store_true", help="every entry")
+    sub.add_parser("compact", help="drop stale entries and VACUUM")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.db):
+        parser.error(f"no cache at {args.db}")
+
+    with SNRCache(args.db) as cache:
+        if args.command == "stats":
+            for key, value in cache.stats().items():
+                print(f"{key}: {value}")
+        elif args.command == "list":
+            for path, params, snr, reason, _ in cache.entries(args.prefix):
+                value = reason if snr is None else f"{snr:.2f}"
+                print(f"{path}\t{value}\t{params}")
+        elif args.command == "invalidate":
+            removed = cache.invalidate(prefix=args.prefix, stale=args.stale)
+            print(f"Removed {removed} entries")
+        elif args.command == "compact":
+            removed = cache.compact()
+            print(f"Removed {removed} stale entries; {cache.stats()['db_bytes']} bytes")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,165 @@
+"""
+Command-line entry point for WADA-SNR scoring.
+
+Only the standard library is imported up front; snr_utils (NumPy) is
+imported when a command runs, and soundfile / the process pool only when
+a file or option needs them. librosa, pandas and SciPy are never loaded.
+
+Usage:
+    python snr_cli.py score <file_or_dir> [...] [--ocean] [--workers N] [--cache DB] [--output CSV]
+    python snr_cli.py score <file_or_dir> [...] --decide 15
+    python snr_cli.py score <file_or_dir> [...] --incremental   (approximate, see below)
+    python snr_cli.py importtime [--budget-ms 500]
+
+--incremental scores full windows with snr_utils.incremental_windowed_snr,
+which is faster on long files but approximate: file averages can be a few
+tenths of a dB off the exact value, so do not use it to shortlist against
+a threshold.
+"""
+
+import os
+import re
+import sys
+import csv
+import argparse
+import subprocess
+
+# Modules the SNR path must not pull in at import time
+HEAVY_MODULES = ("librosa", "pandas", "scipy", "matplotlib", "torch", "sklearn", "soundfile")
+# What the score command imports before touching any audio
+SNR_MODULES = ("snr_cli", "snr_utils", "snr_cache", "wav_index", "wav_reader")
+# Cold-start import budget of SNR_MODULES (tests/test_import_time.py)
+IMPORT_BUDGET_MS = 500.0
+
+
+def _audio_paths(inputs):
+    from wav_index import walk_wavs
+    for path in inputs:
+        if os.path.isdir(path):
+            yield from walk_wavs(path)
+        else:
+            yield path
+
+
+def _options(args):
+    options = {"min_duration": 0.5, "partial_windows": True} if args.ocean else {"min_duration": 7.0}
+    if args.min_duration is not None:
+        options["min_duration"] = args.min_duration
+    if args.streaming:
+        options["streaming"] = True
+    if args.incremental:
+        options["incremental"] = True
+    return options
+
+
+def score(args):
+    from snr_cache import SNRCache
+    from snr_utils import cached_window_snr_decision, map_window_snr
+
+    paths = list(_audio_paths(args.inputs))
+    options = _options(args)
+    cache = SNRCache(args.cache) if args.cache else None
+    out = open(args.output, "w", newline="") if args.output else sys.stdout
+    try:
+        writer = csv.writer(out)
+        if args.decide is not None:
+            options.pop("streaming", None)
+            options.pop("incremental", None)
+            writer.writerow(["Path", f"SNR_ge_{args.decide:g}", "SNR_estimate", "Status"])
+            for path in paths:
+                try:
+                    passed, estimate, reason = cached_window_snr_decision(path, args.decide, cache, **options)
+                except Exception as e:
+                    writer.writerow([path, "", "", f"error: {type(e).__name__}: {e}"])
+                    continue
+                writer.writerow([path, "" if passed is None else int(passed),
+                                 "" if estimate is None else estimate, reason or "ok"])
+        else:
+            writer.writerow(["Path", "SNR_dB", "Status"])
+            for path, snr, reason, error in map_window_snr(paths, workers=args.workers, cache=cache,
+                                                           **options):
+                status = f"error: {error}" if error is not None else (reason or "ok")
+                writer.writerow([path, "" if snr is None else snr, status])
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        if cache is not None:
+            cache.close()
+    return 0
+
+
+def measure_import_time(modules=SNR_MODULES):
+    """
+    Cold-start import of `modules` in a fresh interpreter, timed with
+    python -X importtime. Returns (total_ms, {top-level module: ms},
+    set of every module imported).
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import " + ", ".join(modules)],
+        capture_output=True, text=True, cwd=here, env=dict(os.environ, PYTHONPATH=here),
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    top_level = {}
+    imported = set()
+    for line in result.stderr.splitlines():
+        match = re.match(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)", line)
+        if match is None:
+            continue
+        name = match.group(4)
+        imported.add(name)
+        if len(match.group(3)) == 1:  # nested imports are indented further
+            top_level[name] = int(match.group(2)) / 1000
+    return sum(top_level.values()), top_level, imported
+
+
+def importtime(args):
+    total_ms, top_level, imported = measure_import_time()
+    for name, ms in sorted(top_level.items(), key=lambda item: -item[1])[:10]:
+        print(f"{ms:8.1f} ms  {name}")
+    print(f"{total_ms:8.1f} ms  total (budget {args.budget_ms:g} ms)")
+
+    heavy = sorted(m for m in imported if m.split(".")[0] in HEAVY_MODULES)
+    failed = False
+    if heavy:
+        print(f"FAIL: heavy modules imported at start-up: {', '.join(heavy)}")
+        failed = True
+    if total_ms > args.budget_ms:
+        print("FAIL: import time over budget")
+        failed = True
+    if not failed:
+        print("OK")
+    return 1 if failed else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="WADA-SNR of WAV files and folders.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_score = sub.add_parser("score", help="average windowed SNR per file, as CSV")
+    p_score.add_argument("inputs", nargs="+", help=".wav files or folders (searched recursively)")
+    p_score.add_argument("--ocean", action="store_true",
+                         help="Speech Ocean rule: windows cut short at the end, min duration 0.5 s")
+    p_score.add_argument("--min-duration", type=float, help="override the minimum duration (s)")
+    p_score.add_argument("--workers", type=int, default=1, help="worker processes (1 = in-process)")
+    p_score.add_argument("--cache", help="SNR cache file (snr_cache.py), e.g. <root>/.snr_cache.sqlite")
+    p_score.add_argument("--output", help="CSV file (default: stdout)")
+    mode = p_score.add_mutually_exclusive_group()
+    mode.add_argument("--streaming", action="store_true", help="read long files in chunks")
+    mode.add_argument("--incremental", action="store_true",
+                      help="approximate linear-time windows (can be ~0.3 dB off; not for shortlisting)")
+    mode.add_argument("--decide", type=float, metavar="THRESHOLD",
+                      help="only decide SNR >= THRESHOLD, stopping early when certain")
+    p_score.set_defaults(func=score)
+
+    p_import = sub.add_parser("importtime", help="check cold-start import time of the SNR modules")
+    p_import.add_argument("--budget-ms", type=float, default=IMPORT_BUDGET_MS)
+    p_import.set_defaults(func=importtime)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
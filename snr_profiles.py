@@ -0,0 +1,270 @@
+"""
+Per-window WADA-SNR profiles of a whole corpus, kept for re-thresholding.
+
+window_snr only keeps the rounded mean of each file's windows. Here the
+full series is stored once in a columnar .npz: every window of every file
+in one ragged float32 array, `offsets` marking where each file's windows
+start, and a path index. Means, medians, the share of windows above a
+threshold, worst windows and shortlists are then derived from the store
+with whole-array NumPy operations, without touching the audio again.
+
+The exact window_snr value of every file is stored alongside (`mean_snr`),
+so a mean-based shortlist from the store is the one window_snr would give.
+Other aggregates are computed from the float32 values, which are the
+1 dB table values to within float32 rounding.
+
+Usage:
+    python snr_profiles.py build <audio_root> <profiles.npz> [--ocean] [--workers N]
+    python snr_profiles.py summary <profiles.npz>
+    python snr_profiles.py shortlist <profiles.npz> [--stat mean|median|percent_above] [--threshold 15]
+"""
+
+import os
+import sys
+import json
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import snr_utils
+from wav_index import walk_wavs
+
+# window_snr options of the two corpora
+MPS_OPTIONS = {"min_duration": 7.0}
+SPEECH_OCEAN_OPTIONS = {"min_duration": 0.5, "partial_windows": True}
+
+
+def _profile_task(task):
+    audio_path, options = task
+    options = dict(options)
+    drop_first = options.pop("drop_first", snr_utils.DROP_FIRST_IF_SEVERAL)
+    try:
+        values, reason = snr_utils.window_snr_values(audio_path, **options)
+    except Exception as e:
+        return None, None, f"{type(e).__name__}: {e}"
+    if values is None:
+        return None, None, reason
+    return np.asarray(values, dtype=np.float32), snr_utils._average_snr(values, drop_first), None
+
+
+class SNRProfiles:
+    """
+    Ragged per-window SNR store: the windows of file i are
+    values[offsets[i]:offsets[i + 1]] (first window included). Skipped
+    files have no windows and their skip reason (or error) in `reasons`.
+    """
+
+    def __init__(self, paths, values, offsets, mean_snr, reasons, params, root=None):
+        self.paths = list(paths)
+        self.values = np.asarray(values, dtype=np.float32)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.mean_snr = np.asarray(mean_snr, dtype=np.float64)
+        self.reasons = list(reasons)
+        self.params = params
+        self.root = root
+        self.index = {path: i for i, path in enumerate(self.paths)}
+
+    def __len__(self):
+        return len(self.paths)
+
+    # --- building and storage ---
+
+    @classmethod
+    def build(cls, audio_paths, root=None, workers=1, chunksize=4, **options):
+        """
+        Score every file once and keep its windows. Paths are stored
+        relative to `root` when given. workers > 1 uses a process pool;
+        results keep the input order.
+        """
+        audio_paths = list(audio_paths)
+        tasks = [(path, options) for path in audio_paths]
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers, initializer=snr_utils._init_worker,
+                                     initargs=((snr_utils.db_vals, snr_utils.g_vals),)) as pool:
+                results = list(pool.map(_profile_task, tasks, chunksize=chunksize))
+        else:
+            results = [_profile_task(task) for task in tasks]
+
+        lengths = [0 if values is None else len(values) for values, _, _ in results]
+        offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+        values = np.empty(offsets[-1], dtype=np.float32)
+        mean_snr = np.full(len(results), np.nan)
+        reasons = []
+        for i, (file_values, mean, reason) in enumerate(results):
+            if file_values is not None:
+                values[offsets[i]:offsets[i + 1]] = file_values
+                mean_snr[i] = mean
+            reasons.append(reason or "")
+        if root is not None:
+            audio_paths = [os.path.relpath(path, root) for path in audio_paths]
+        return cls(audio_paths, values, offsets, mean_snr, reasons, snr_utils.snr_params(**options), root)
+
+    @classmethod
+    def build_tree(cls, audio_root, workers=1, **options):
+        """Profiles of every .wav under audio_root, in os.walk order."""
+        return cls.build(walk_wavs(audio_root), root=audio_root, workers=workers, **options)
+
+    def save(self, npz_path):
+        np.savez_compressed(
+            npz_path,
+            paths=np.array(self.paths, dtype=str),
+            values=self.values,
+            offsets=self.offsets,
+            mean_snr=self.mean_snr,
+            reasons=np.array(self.reasons, dtype=str),
+            meta=np.array(json.dumps({"params": self.params, "root": self.root})),
+        )
+
+    @classmethod
+    def load(cls, npz_path):
+        with np.load(npz_path) as data:
+            meta = json.loads(str(data["meta"]))
+            return cls(data["paths"].tolist(), data["values"], data["offsets"], data["mean_snr"],
+                       data["reasons"].tolist(), meta["params"], meta["root"])
+
+    # --- per-file access ---
+
+    def _row(self, path):
+        if path not in self.index and self.root is not None:
+            path = os.path.relpath(path, self.root)
+        return self.index[path]
+
+    def profile(self, path):
+        """The per-window SNRs of one file (a view into the store)."""
+        i = self._row(path)
+        return self.values[self.offsets[i]:self.offsets[i + 1]]
+
+    def skip_reason(self, path):
+        return self.reasons[self._row(path)] or None
+
+    # --- aggregates (one value per file, NaN for files without windows) ---
+
+    def _segments(self, drop_first=True):
+        """
+        (file index, window number, value) of every kept window: NaN windows
+        removed and, with drop_first, each file's first window removed when
+        it has more than one (the rule window_snr applies).
+        """
+        lengths = np.diff(self.offsets)
+        file_of = np.repeat(np.arange(len(self)), lengths)
+        window_number = np.arange(len(self.values)) - np.repeat(self.offsets[:-1], lengths)
+        keep = ~np.isnan(self.values)
+        if drop_first:
+            keep[self.offsets[:-1][lengths > 1]] = False
+        return file_of[keep], window_number[keep], self.values[keep].astype(np.float64)
+
+    def _sorted_segments(self, drop_first=True):
+        # Kept windows sorted by file, then by value
+        file_of, window_number, values = self._segments(drop_first)
+        order = np.lexsort((values, file_of))
+        counts = np.bincount(file_of, minlength=len(self))
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]]).astype(np.int64)
+        return values[order], window_number[order], counts, starts
+
+    def counts(self, drop_first=True):
+        """Number of non-NaN windows each aggregate is taken over."""
+        file_of, _, _ = self._segments(drop_first)
+        return np.bincount(file_of, minlength=len(self))
+
+    def mean(self, drop_first=True):
+        """
+        Mean window SNR. With drop_first this is the stored window_snr value
+        (rounded to 2 decimals); otherwise it is computed from the store.
+        """
+        if drop_first:
+            return self.mean_snr.copy()
+        file_of, _, values = self._segments(drop_first)
+        counts = np.bincount(file_of, minlength=len(self))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.bincount(file_of, weights=values, minlength=len(self)) / counts
+
+    def median(self, drop_first=True):
+        values, _, counts, starts = self._sorted_segments(drop_first)
+        result = np.full(len(self), np.nan)
+        has = counts > 0
+        lo = starts[has] + (counts[has] - 1) // 2
+        hi = starts[has] + counts[has] // 2
+        result[has] = (values[lo] + values[hi]) / 2
+        return result
+
+    def percent_above(self, threshold=15.0, drop_first=True):
+        """Percentage of windows with SNR >= threshold."""
+        file_of, _, values = self._segments(drop_first)
+        counts = np.bincount(file_of, minlength=len(self))
+        above = np.bincount(file_of, weights=values >= threshold, minlength=len(self))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return 100 * above / counts
+
+    def worst_window(self, drop_first=True):
+        """
+        (lowest window SNR, its window number within the file) per file;
+        NaN / -1 for files without windows.
+        """
+        values, window_number, counts, starts = self._sorted_segments(drop_first)
+        worst = np.full(len(self), np.nan)
+        where = np.full(len(self), -1, dtype=np.int64)
+        has = counts > 0
+        worst[has] = values[starts[has]]
+        where[has] = window_number[starts[has]]
+        return worst, where
+
+    def shortlist(self, threshold=15.0, stat="mean", drop_first=True):
+        """
+        Paths whose `stat` (mean, median or percent_above) is >= threshold.
+        For percent_above, `threshold` is the per-window SNR and files need
+        at least 50% of windows above it.
+        """
+        if stat == "mean":
+            values = self.mean(drop_first)
+        elif stat == "median":
+            values = self.median(drop_first)
+        elif stat == "percent_above":
+            values = self.percent_above(threshold, drop_first)
+            threshold = 50
+        else:
+            raise ValueError(f"unknown statistic {stat!r}")
+        with np.errstate(invalid='ignore'):
+            selected = np.flatnonzero(values >= threshold)
+        return [self.paths[i] for i in selected]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build and query per-window SNR profiles.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_build = sub.add_parser("build", help="score every .wav under a root once")
+    p_build.add_argument("audio_root")
+    p_build.add_argument("output", help="profiles .npz")
+    p_build.add_argument("--ocean", action="store_true", help="Speech Ocean window rule (partial windows)")
+    p_build.add_argument("--workers", type=int, default=os.cpu_count())
+    p_summary = sub.add_parser("summary", help="store size and per-file aggregates")
+    p_summary.add_argument("profiles")
+    p_short = sub.add_parser("shortlist", help="print the files passing a threshold")
+    p_short.add_argument("profiles")
+    p_short.add_argument("--stat", default="mean", choices=["mean", "median", "percent_above"])
+    p_short.add_argument("--threshold", type=float, default=15.0)
+    p_short.add_argument("--keep-first", action="store_true", help="include each file's first window")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        options = SPEECH_OCEAN_OPTIONS if args.ocean else MPS_OPTIONS
+        profiles = SNRProfiles.build_tree(args.audio_root, workers=args.workers, **options)
+        profiles.save(args.output)
+        print(f"{len(profiles)} files, {len(profiles.values)} windows -> {args.output}")
+    elif args.command == "summary":
+        profiles = SNRProfiles.load(args.profiles)
+        scored = ~np.isnan(profiles.mean_snr)
+        print(f"{len(profiles)} files ({scored.sum()} scored), {len(profiles.values)} windows")
+        print(f"params: {json.dumps(profiles.params)}")
+        if scored.any():
+            print(f"mean SNR: median over files {np.median(profiles.mean_snr[scored]):.2f} dB")
+            print(f"windows >= 15 dB: {np.nanmean(profiles.percent_above(15.0)):.1f}% on average")
+    elif args.command == "shortlist":
+        profiles = SNRProfiles.load(args.profiles)
+        for path in profiles.shortlist(args.threshold, args.stat, drop_first=not args.keep_first):
+            print(path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,937 @@
+"""
+Shared WADA-SNR utilities for the MPS and Speech Ocean scripts.
+Changes referred from - https://gist.github.com/peter-grajcar/4e4ebd8b700cf3e4e9e3aaff603e8426
+
+Each file is decoded once; the 6 second windows hopping every second are
+taken as strided views over that single buffer instead of re-opening the
+file with librosa.load(offset=j, duration=6.0) for every hop.
+
+Only NumPy is imported with the module. soundfile (non-PCM files,
+streaming) and the process pool are imported on first use, so scripts and
+snr_cli.py start quickly.
+"""
+
+import os
+import csv
+import math
+import wave
+
+import numpy as np
+
+from wav_reader import parse_pcm16_layout, pcm_to_float32, read_pcm16
+
+
+# next 2 lines define a fancy curve derived from a gamma distribution -- see paper
+db_vals = np.arange(-20, 101)
+g_vals = np.array([0.40974774, 0.40986926, 0.40998566, 0.40969089, 0.40986186, 0.40999006, 0.41027138, 0.41052627, 0.41101024, 0.41143264, 0.41231718, 0.41337272, 0.41526426, 0.4178192 , 0.42077252, 0.42452799, 0.42918886, 0.43510373, 0.44234195, 0.45161485, 0.46221153, 0.47491647, 0.48883809, 0.50509236, 0.52353709, 0.54372088, 0.56532427, 0.58847532, 0.61346212, 0.63954496, 0.66750818, 0.69583724, 0.72454762, 0.75414799, 0.78323148, 0.81240985, 0.84219775, 0.87166406, 0.90030504, 0.92880418, 0.95655449, 0.9835349 , 1.01047155, 1.0362095 , 1.06136425, 1.08579312, 1.1094819 , 1.13277995, 1.15472826, 1.17627308, 1.19703503, 1.21671694, 1.23535898, 1.25364313, 1.27103891, 1.28718029, 1.30302865, 1.31839527, 1.33294817, 1.34700935, 1.3605727 , 1.37345513, 1.38577122, 1.39733504, 1.40856397, 1.41959619, 1.42983624, 1.43958467, 1.44902176, 1.45804831, 1.46669568, 1.47486938, 1.48269965, 1.49034339, 1.49748214, 1.50435106, 1.51076426, 1.51698915, 1.5229097 , 1.528578  , 1.53389835, 1.5391211 , 1.5439065 , 1.54858517, 1.55310776, 1.55744391, 1.56164927, 1.56566348, 1.56938671, 1.57307767, 1.57654764, 1.57980083, 1.58304129, 1.58602496, 1.58880681, 1.59162477, 1.5941969 , 1.59693155, 1.599446  , 1.60185011, 1.60408668, 1.60627134, 1.60826199, 1.61004547, 1.61192472, 1.61369656, 1.61534074, 1.61688905, 1.61838916, 1.61985374, 1.62135878, 1.62268119, 1.62390423, 1.62513143, 1.62632463, 1.6274027 , 1.62842767, 1.62945532, 1.6303307 , 1.63128026, 1.63204102])
+
+
+# --- Silence check ---
+
+# This way to check for silence is not final yet, it is a placeholder
+# and can be replaced later
+def complete_silence_check(audio):
+    # Threshold setup
+    max_value_in_wav_file = 127
+    max_value_16_bit = 32768
+    silence_threshold = max_value_in_wav_file / max_value_16_bit  # ~0.003875
+
+    # Sliding window parameters
+    window_size = 8000
+    hop_size = 4000
+
+    # Sliding window logic (averaged in float64 so float32 input gives the same answer)
+    for start in range(0, len(audio) - window_size + 1, hop_size):
+        window = audio[start:start + window_size]
+        if np.abs(window).mean(dtype=np.float64) > silence_threshold:
+            return True
+
+    return False
+
+
+def _blocks_have_sound(blocks, blocksize):
+    # Each 8000-sample window is two 4000-sample hops, so window sums come from
+    # per-hop sums of |x| (the last hop carried across block edges) instead of
+    # one average per window. The integer comparison is exactly the float64
+    # one complete_silence_check makes.
+    max_value_in_wav_file = 127
+    window_size = 8000
+    hop_size = 4000
+    if blocksize % hop_size:
+        raise ValueError("blocksize must be a multiple of 4000 samples")
+
+    previous_hop = None  # |x| sum of the last complete hop of the previous block
+    for block in blocks:
+        n_hops = len(block) // hop_size
+        if n_hops == 0:
+            break
+        channels = block.shape[1]
+        hops = np.abs(block[:n_hops * hop_size].astype(np.int32))
+        hop_sums = hops.reshape(n_hops, -1).sum(axis=1, dtype=np.int64)
+        if previous_hop is not None:
+            hop_sums = np.concatenate([[previous_hop], hop_sums])
+        window_sums = hop_sums[:-1] + hop_sums[1:]
+        if np.any(window_sums > max_value_in_wav_file * window_size * channels):
+            return True
+        previous_hop = hop_sums[-1]
+        if len(block) < blocksize:
+            break
+
+    return False
+
+
+def complete_silence_check_pcm(pcm, blocksize=40 * 4000):
+    """
+    complete_silence_check for int16 PCM (e.g. a wav_reader memmap), taken a
+    block at a time and stopping at the first non-silent window, so only the
+    pages up to that point are ever read.
+    """
+    pcm = pcm.reshape(len(pcm), -1)
+    blocks = (pcm[start:start + blocksize] for start in range(0, len(pcm), blocksize))
+    return _blocks_have_sound(blocks, blocksize)
+
+
+def complete_silence_check_file(audio_path, blocksize=40 * 4000):
+    """
+    Streaming form of complete_silence_check that works from the file.
+
+    The PCM is read as int16 in blocks and the check returns as soon as the
+    first non-silent 8000-sample window is seen, so speech files usually
+    exit within the first block and silent files are rejected without a
+    float decode.
+    """
+    if parse_pcm16_layout(audio_path) is not None:
+        return complete_silence_check_pcm(read_pcm16(audio_path)[0], blocksize)
+    import soundfile as sf
+    blocks = sf.blocks(audio_path, blocksize=blocksize, dtype='int16', always_2d=True)
+    return _blocks_have_sound(blocks, blocksize)
+
+
+# --- SNR algorithm ---
+
+def wada_snr(wav, epsilon=1e-10):
+    """
+    Direct blind estimation of the SNR of a speech signal.
+    Paper on WADA SNR:
+      http://www.cs.cmu.edu/~robust/Papers/KimSternIS08.pdf
+    This function was adapted from this matlab code:
+      https://labrosa.ee.columbia.edu/projects/snreval/#9
+
+    Unlike the per-script copies, `wav` is not modified in place, so it can
+    be a view into a larger buffer.
+    """
+    # center around 0
+    wav = wav - wav.mean()
+
+    # enery is calculated before normalisation
+    energy = (wav**2).sum()
+
+    # peak normalise
+    wav = wav / np.abs(wav).max()
+    # get magnitude
+    abs_wav = abs(wav)
+    # clip lower bound
+    abs_wav[abs_wav < epsilon] = epsilon
+
+    # calcuate statistics
+    # E[|z|]
+    v1 = max(epsilon, abs_wav.mean())
+    # E[log|z|]
+    v2 = np.log(abs_wav).mean()
+    # log(E[|z|]) - E[log(|z|)]
+    v3 = np.log(v1) - v2
+
+    # table interpolation
+    wav_snr_idx = None
+    if any(g_vals < v3):
+        wav_snr_idx = np.where(g_vals < v3)[0].max()
+    # handle edge cases
+    if wav_snr_idx is None:
+        wav_snr = db_vals[0]
+    elif wav_snr_idx == len(db_vals) - 1:
+        wav_snr = db_vals[-1]
+    else:
+        wav_snr = db_vals[wav_snr_idx + 1]
+
+    # Calculate SNR
+    factor = 10 ** (wav_snr / 10)
+    noise_energy = energy / (1 + factor)
+    signal_energy = energy * factor / (1 + factor)
+    snr = 10 * np.log10(signal_energy / noise_energy)
+
+    return snr
+
+
+# g_vals is not monotonic at the low end, so "largest index with g_vals < v3"
+# is looked up in its suffix minimum, which is sorted and gives the same index.
+_g_suffix_min = np.minimum.accumulate(g_vals[::-1])[::-1]
+
+
+def wada_snr_batch(windows, epsilon=1e-10, axis=-1):
+    """
+    wada_snr for many windows at once, e.g. every row of the strided view
+    returned by sliding_windows(). Statistics are reduced along `axis` and
+    all table indices are resolved with one searchsorted. Returns an array
+    with `axis` removed whose values match wada_snr exactly.
+    """
+    windows = np.moveaxis(np.asarray(windows), axis, -1)
+
+    # center around 0
+    wav = windows - windows.mean(axis=-1, keepdims=True)
+
+    # enery is calculated before normalisation
+    energy = (wav**2).sum(axis=-1)
+
+    # peak normalise
+    wav = wav / np.abs(wav).max(axis=-1, keepdims=True)
+    # get magnitude
+    abs_wav = abs(wav)
+    # clip lower bound
+    abs_wav[abs_wav < epsilon] = epsilon
+
+    # E[|z|], E[log|z|]
+    mean_abs = abs_wav.mean(axis=-1)
+    v2 = np.log(abs_wav).mean(axis=-1)
+    # log(E[|z|]) - E[log(|z|)], with max(epsilon, E[|z|]) kept in the same
+    # precision the scalar version ends up with
+    v3 = (np.log(mean_abs) - v2).astype(np.float64)
+    floored = ~(mean_abs > epsilon)
+    v3[floored] = np.log(epsilon) - v2[floored]
+
+    # table interpolation: largest index with g_vals < v3, -1 if none
+    wav_snr_idx = np.searchsorted(_g_suffix_min, v3, side='left') - 1
+    wav_snr_idx[np.isnan(v3)] = -1
+    # handle edge cases
+    wav_snr = db_vals[np.clip(wav_snr_idx + 1, 0, len(db_vals) - 1)]
+
+    # Calculate SNR
+    factor = 10 ** (wav_snr / 10)
+    noise_energy = energy / (1 + factor)
+    signal_energy = energy * factor / (1 + factor)
+    snr = 10 * np.log10(signal_energy / noise_energy)
+
+    return snr
+
+
+def _wada_snr_rows_inplace(wav, scratch, epsilon=1e-10):
+    """
+    wada_snr_batch over the rows of a C-contiguous float32 array, reusing
+    `wav` and one same-shaped `scratch` buffer for every temporary. `wav`
+    is overwritten. Each step and reduction is the one wada_snr_batch
+    performs, so the results are identical.
+    """
+    # center around 0
+    wav -= wav.mean(axis=-1, keepdims=True)
+    # enery is calculated before normalisation
+    energy = np.square(wav, out=scratch).sum(axis=-1)
+    # peak normalise
+    wav /= np.abs(wav, out=scratch).max(axis=-1, keepdims=True)
+    # magnitude, clipped at epsilon
+    np.abs(wav, out=wav)
+    np.maximum(wav, np.float32(epsilon), out=wav)
+
+    mean_abs = wav.mean(axis=-1)
+    v2 = np.log(wav, out=wav).mean(axis=-1)
+    v3 = (np.log(mean_abs) - v2).astype(np.float64)
+    floored = ~(mean_abs > epsilon)
+    v3[floored] = np.log(epsilon) - v2[floored]
+
+    wav_snr_idx = np.searchsorted(_g_suffix_min, v3, side='left') - 1
+    wav_snr_idx[np.isnan(v3)] = -1
+    wav_snr = db_vals[np.clip(wav_snr_idx + 1, 0, len(db_vals) - 1)]
+
+    factor = 10 ** (wav_snr / 10)
+    noise_energy = energy / (1 + factor)
+    signal_energy = energy * factor / (1 + factor)
+    return 10 * np.log10(signal_energy / noise_energy)
+
+
+def wada_snr_int16(windows, chunk=8, epsilon=1e-10):
+    """
+    wada_snr_batch for a 2-D int16 array of windows (e.g. sliding_windows
+    over int16 PCM), converted and scored `chunk` rows at a time in two
+    reused float32 buffers. Peak memory is the int16 PCM plus
+    2 * chunk * window_size * 4 bytes, instead of the float32 signal plus
+    several float32 temporaries the size of every window; results are
+    identical to wada_snr_batch on the float32 decode.
+    """
+    n_windows, window_size = windows.shape
+    snr = np.empty(n_windows)
+    wav = np.empty((min(chunk, n_windows), window_size), dtype=np.float32)
+    scratch = np.empty_like(wav)
+    for start in range(0, n_windows, chunk):
+        rows = windows[start:start + chunk]
+        m = len(rows)
+        pcm_to_float32(rows, out=wav[:m])
+        snr[start:start + m] = _wada_snr_rows_inplace(wav[:m], scratch[:m], epsilon)
+    return snr
+
+
+# --- Windowing ---
+
+def to_mono(audio):
+    # Same down-mix librosa.load applies
+    if audio.ndim > 1:
+        return audio.mean(axis=1)
+    return audio
+
+
+def sliding_windows(audio, sample_rate, window=6.0, hop=1.0):
+    """
+    Full `window`-second windows hopping every `hop` seconds, returned as a
+    2-D strided view over `audio` (no copy). Window j starts at sample
+    int(j * hop * sample_rate), which is where librosa.load(offset=j * hop)
+    starts reading.
+    """
+    window_size = int(window * sample_rate)
+    hop_size = int(hop * sample_rate)
+    n_windows = int((len(audio) / sample_rate - window) / hop) + 1
+    if window_size > len(audio) or n_windows <= 0:
+        return np.empty((0, window_size), dtype=audio.dtype)
+    windows = np.lib.stride_tricks.sliding_window_view(audio, window_size)[::hop_size]
+    return windows[:n_windows]
+
+
+def tail_windows(audio, sample_rate, window=6.0, hop=1.0):
+    """
+    The windows after the last full one that start inside the file, each cut
+    short at the end of the audio (what librosa.load returned for an offset
+    less than 6 s from the end). The Speech Ocean utterances are mostly
+    shorter than one window, so these are often the only windows.
+    """
+    window_size = int(window * sample_rate)
+    n_full = len(sliding_windows(audio, sample_rate, window, hop))
+    for j in range(n_full, int(len(audio) / sample_rate / hop)):
+        start = int(j * hop * sample_rate)
+        yield audio[start:start + window_size]
+
+
+def windowed_snr(audio, sample_rate, window=6.0, hop=1.0, partial_windows=False):
+    """
+    Per-window WADA-SNR over a decoded mono signal (first window included).
+    int16 PCM is scored through wada_snr_int16; float input through
+    wada_snr_batch.
+    """
+    windows = sliding_windows(audio, sample_rate, window, hop)
+    if audio.dtype == np.int16:
+        snr = wada_snr_int16(windows)
+    else:
+        snr = wada_snr_batch(windows)
+    if partial_windows:
+        tail = [wada_snr(_as_float(w)) for w in tail_windows(audio, sample_rate, window, hop)]
+        snr = np.concatenate([snr, tail])
+    return snr
+
+
+def _as_float(audio):
+    return pcm_to_float32(audio) if audio.dtype == np.int16 else audio
+
+
+def _sliding_max(values, k):
+    """Max over every run of k consecutive values in O(n) (van Herk / Gil-Werman)."""
+    n = len(values)
+    pad = (-n) % k
+    padded = np.concatenate([values, np.full(pad, -np.inf)]).reshape(-1, k)
+    prefix = np.maximum.accumulate(padded, axis=1).ravel()
+    suffix = np.maximum.accumulate(padded[:, ::-1], axis=1)[:, ::-1].ravel()
+    return np.maximum(suffix[:n - k + 1], prefix[k - 1:n])
+
+
+def incremental_windowed_snr(audio, sample_rate, window=6.0, hop=1.0, epsilon=1e-10):
+    """
+    Approximate windowed_snr (full windows only), computed in one linear
+    pass from per-hop block sums instead of re-reducing every overlapping
+    window. Not a replacement for the exact path when a threshold decision
+    depends on the value.
+
+    The peak cancels out of log(E|z|) - E[log|z|] apart from the epsilon
+    floor, so it is only needed per window through a sliding maximum of the
+    block peaks. Statistics are taken around the mean of the analysed span;
+    the per-window mean-centering is applied exactly to the energy and to
+    first order to E|z| (E[log|z|] is left uncorrected). Because the
+    result is snapped to the 1 dB WADA table, a window whose statistic sits
+    near a table edge can move by one step; on synthetic speech about 2% of
+    windows do (up to ~15% in a single file), and file averages differ by
+    ~0.02 dB on average and up to ~0.3 dB on 60 s MPS files, enough to move
+    a file across a 15 dB shortlist threshold. tests/test_incremental_snr.py
+    holds it to these bounds.
+    """
+    window_size = int(window * sample_rate)
+    hop_size = int(hop * sample_rate)
+    if window_size % hop_size:
+        raise ValueError("window must be a whole number of hops")
+    k = window_size // hop_size
+    n_windows = int((len(audio) / sample_rate - window) / hop) + 1
+    if window_size > len(audio) or n_windows <= 0:
+        return np.empty(0)
+
+    n_blocks = n_windows + k - 1
+    blocks = np.asarray(_as_float(audio[:n_blocks * hop_size]), dtype=np.float64).reshape(n_blocks, hop_size)
+    centre = blocks.mean()
+    z = blocks - centre
+    abs_z = np.abs(z)
+    nonzero = abs_z > 0
+
+    # per-block sums (one pass over the samples)
+    sum_z = z.sum(axis=1)
+    sum_sq = (z * z).sum(axis=1)
+    sum_abs = abs_z.sum(axis=1)
+    sum_sign = np.sign(z).sum(axis=1)
+    sum_log = np.log(abs_z, where=nonzero, out=np.zeros_like(abs_z)).sum(axis=1)
+    n_zero = (~nonzero).sum(axis=1)
+    peak = abs_z.max(axis=1)
+
+    def _window_sums(per_block):
+        c = np.concatenate([[0], np.cumsum(per_block)])
+        return c[k:] - c[:-k]
+
+    n = window_size
+    delta = _window_sums(sum_z) / n  # window mean relative to the span mean
+    energy = _window_sums(sum_sq) - n * delta**2
+    total_abs = _window_sums(sum_abs) - delta * _window_sums(sum_sign)
+    total_log = _window_sums(sum_log)
+    zeros = _window_sums(n_zero)
+    peak = _sliding_max(peak, k)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # E[|z|], E[log|z|] of the peak-normalised, epsilon-floored window
+        v1 = np.maximum(epsilon, (total_abs / peak + zeros * epsilon) / n)
+        v2 = (total_log - (n - zeros) * np.log(peak) + zeros * np.log(epsilon)) / n
+        v3 = np.log(v1) - v2
+
+        wav_snr_idx = np.searchsorted(_g_suffix_min, v3, side='left') - 1
+        wav_snr_idx[np.isnan(v3)] = -1
+        wav_snr = db_vals[np.clip(wav_snr_idx + 1, 0, len(db_vals) - 1)]
+
+        factor = 10 ** (wav_snr / 10)
+        noise_energy = energy / (1 + factor)
+        signal_energy = energy * factor / (1 + factor)
+        snr = 10 * np.log10(signal_energy / noise_energy)
+
+    return snr
+
+
+# --- Streaming ---
+
+def _window_counts(n_frames, sample_rate, window=6.0, hop=1.0, partial_windows=False):
+    # (full windows, all windows) for a file of n_frames, as sliding_windows
+    # and tail_windows count them
+    n_full = int((n_frames / sample_rate - window) / hop) + 1
+    if int(window * sample_rate) > n_frames or n_full <= 0:
+        n_full = 0
+    if not partial_windows:
+        return n_full, n_full
+    return n_full, max(n_full, int(n_frames / sample_rate / hop))
+
+
+def stream_windowed_snr(audio_path, window=6.0, hop=1.0, partial_windows=False, chunk_seconds=60.0):
+    """
+    Yield the per-window SNRs windowed_snr would return for the whole file
+    (first window included), reading `chunk_seconds` of audio at a time.
+
+    Only the part of the buffer the next window starts in (less than one
+    window) is carried into the next read, so memory is one window plus
+    one chunk of samples plus the wada_snr_int16 scratch, whatever the
+    length of the file. Mono files stay int16; multi-channel chunks are
+    down-mixed to float32 as they are read. Values are identical to the
+    in-memory path.
+    """
+    import soundfile as sf
+    with sf.SoundFile(audio_path) as f:
+        sample_rate, channels = f.samplerate, f.channels
+        window_size = int(window * sample_rate)
+        hop_size = int(hop * sample_rate)
+        n_full, n_total = _window_counts(f.frames, sample_rate, window, hop, partial_windows)
+        chunk_frames = max(1, int(chunk_seconds / hop)) * hop_size
+
+        buf = np.empty(window_size + chunk_frames, dtype=np.int16 if channels == 1 else np.float32)
+        pcm = None if channels == 1 else np.empty((chunk_frames, channels), dtype=np.int16)
+        buf_start = 0  # file position of buf[0]
+        filled = 0
+        j = 0  # next window
+        while j < n_total:
+            if pcm is None:
+                got = len(f.read(dtype='int16', out=buf[filled:filled + chunk_frames]))
+            else:
+                block = f.read(dtype='int16', out=pcm)
+                got = len(block)
+                buf[filled:filled + got] = to_mono(pcm_to_float32(block))
+            filled += got
+
+            # full windows that now end inside the buffer
+            end = buf_start + filled
+            last = min(n_full, (end - window_size) // hop_size + 1) if end >= window_size else 0
+            if last > j:
+                views = np.lib.stride_tricks.sliding_window_view(buf[:filled], window_size)
+                windows = views[j * hop_size - buf_start::hop_size][:last - j]
+                if pcm is None:
+                    yield from wada_snr_int16(windows)
+                else:
+                    for start in range(0, len(windows), 8):
+                        yield from wada_snr_batch(windows[start:start + 8])
+                j = last
+
+            if got < chunk_frames:
+                # end of file: windows cut short at the end of the audio
+                for j in range(j, n_total):
+                    start = j * hop_size - buf_start
+                    if start >= filled:
+                        break
+                    yield wada_snr(_as_float(buf[start:min(start + window_size, filled)]))
+                break
+
+            keep = j * hop_size - buf_start
+            buf[:filled - keep] = buf[keep:filled]
+            filled -= keep
+            buf_start += keep
+
+
+# Skip reasons reported instead of an SNR value
+NOT_16_BIT = "not a 16-bit file"
+SILENT = "silent"
+TOO_SHORT = "too short"
+
+# First-window rules (drop_first): the MPS scripts and the selectors drop
+# the first window only when there is more than one; the original Speech
+# Ocean CSV updater always dropped it, so a one-window file averaged to NaN.
+DROP_FIRST_IF_SEVERAL = "if_several"
+DROP_FIRST_ALWAYS = "always"
+_DROP_FIRST_RULES = {
+    DROP_FIRST_IF_SEVERAL: "first window dropped when there is more than one",
+    DROP_FIRST_ALWAYS: "first window always dropped",
+}
+
+
+def _check_drop_first(drop_first):
+    if drop_first not in _DROP_FIRST_RULES:
+        raise ValueError(f"drop_first must be one of {tuple(_DROP_FIRST_RULES)}, not {drop_first!r}")
+
+
+def header_skip_reason(header, window=6.0, hop=1.0, min_duration=7.0, partial_windows=False):
+    """
+    The skip reason window_snr_result would give, decided from a WAV header
+    (wav_index.read_header) before any decode; None if the file needs
+    scoring. Silence can only be told from the samples, and unreadable
+    headers are left for the scorer to report.
+    """
+    if header["error"] is not None:
+        return None
+    if header["sampwidth"] != 2:
+        return NOT_16_BIT
+    duration = header["frames"] / header["rate"]
+    if duration < min_duration or duration < (hop if partial_windows else window):
+        return TOO_SHORT
+    return None
+
+
+def _load_for_snr(audio_path, min_duration):
+    """
+    Decode a 16-bit, non-silent file of at least `min_duration` seconds.
+    Returns (audio, sample_rate, None), or (None, None, skip_reason).
+    """
+    with wave.open(audio_path, 'rb') as wav:
+        if wav.getsampwidth() != 2:  # 16-bit
+            return None, None, NOT_16_BIT
+
+    # int16 PCM, memory-mapped for plain PCM files (soundfile otherwise).
+    # Mono PCM is converted to float32 a few windows at a time by
+    # wada_snr_int16; multi-channel files are down-mixed in float32 as
+    # librosa.load did.
+    audio, sample_rate = read_pcm16(audio_path)
+
+    # Do raw wav file based complete silence checks (This method of Silence check is not final yet)
+    # Only the pages up to the first non-silent window are touched
+    if not complete_silence_check_pcm(audio):
+        return None, None, SILENT
+
+    duration = len(audio) / sample_rate
+    if duration < min_duration:
+        return None, None, TOO_SHORT
+
+    if audio.ndim > 1:
+        audio = to_mono(pcm_to_float32(audio))
+    return audio, sample_rate, None
+
+
+def _average_snr(snr_list, drop_first=DROP_FIRST_IF_SEVERAL):
+    snr_list = list(snr_list)
+    if not snr_list:
+        return None
+    if len(snr_list) > 1 or drop_first == DROP_FIRST_ALWAYS:
+        snr_list.pop(0)  # First value of SNR is ignored
+    if snr_list:
+        avg_snr = np.nanmean(snr_list).round(2)
+        return avg_snr
+    else:
+        return np.float64(np.nan)
+
+
+class RunningSNRMean:
+    """
+    _average_snr kept up to date one window at a time in constant memory:
+    the first window is dropped once a second one arrives (or at once with
+    DROP_FIRST_ALWAYS) and NaNs are skipped. The sum is kept exactly
+    (Shewchuk partials, as math.fsum), so value() equals the 2-decimal
+    nanmean of the in-memory list except when the mean lies on a rounding
+    tie to within a few ulps.
+    """
+
+    def __init__(self, drop_first=DROP_FIRST_IF_SEVERAL):
+        self.drop_first = drop_first
+        self.n_windows = 0
+        self.first = None
+        self.count = 0
+        self.partials = []
+
+    def add(self, snr):
+        self.n_windows += 1
+        if self.n_windows == 1:
+            self.first = snr
+        elif not np.isnan(snr):
+            self.count += 1
+            x = float(snr)
+            i = 0
+            for y in self.partials:
+                if abs(x) < abs(y):
+                    x, y = y, x
+                hi = x + y
+                lo = y - (hi - x)
+                if lo:
+                    self.partials[i] = lo
+                    i += 1
+                x = hi
+            self.partials[i:] = [x]
+
+    def value(self):
+        if self.n_windows == 0:
+            return None
+        if self.n_windows == 1 and self.drop_first != DROP_FIRST_ALWAYS:
+            return np.float64(self.first).round(2)
+        if self.count == 0:
+            return np.float64(np.nan)
+        return np.float64(math.fsum(self.partials) / self.count).round(2)
+
+
+def stream_window_snr_result(audio_path, window=6.0, hop=1.0, min_duration=7.0,
+                             partial_windows=False, chunk_seconds=60.0, drop_first=DROP_FIRST_IF_SEVERAL):
+    """
+    window_snr_result in constant memory, for recordings too long to decode
+    at once: the silence gate and the windows are both read incrementally
+    (stream_windowed_snr) and averaged with RunningSNRMean.
+    """
+    with wave.open(audio_path, 'rb') as wav:
+        if wav.getsampwidth() != 2:  # 16-bit
+            return None, NOT_16_BIT
+        duration = wav.getnframes() / wav.getframerate()
+
+    if not complete_silence_check_file(audio_path):
+        return None, SILENT
+    if duration < min_duration:
+        return None, TOO_SHORT
+
+    mean = RunningSNRMean(drop_first)
+    for snr in stream_windowed_snr(audio_path, window, hop, partial_windows, chunk_seconds):
+        mean.add(snr)
+    avg_snr = mean.value()
+    if avg_snr is None:
+        return None, TOO_SHORT  # shorter than one hop
+    return avg_snr, None
+
+
+def snr_params(window=6.0, hop=1.0, min_duration=7.0, partial_windows=False, incremental=False,
+               streaming=False, drop_first=DROP_FIRST_IF_SEVERAL):
+    """
+    Everything that changes the value window_snr returns, e.g. for cache keys.
+
+    MPS: full windows only and min_duration=7.0 (floor(duration) - 6 > 0).
+    Speech Ocean: partial_windows=True and min_duration=0.5.
+    Streaming gives the same windows and average, so it shares the exact key.
+    """
+    _check_drop_first(drop_first)
+    return {
+        "window": float(window),
+        "hop": float(hop),
+        "min_duration": float(min_duration),
+        "partial_windows": bool(partial_windows),
+        "drop_first": _DROP_FIRST_RULES[drop_first],
+        "method": "incremental" if incremental else "exact",
+    }
+
+
+def window_snr_result(audio_path, window=6.0, hop=1.0, min_duration=7.0,
+                      partial_windows=False, incremental=False, streaming=False,
+                      drop_first=DROP_FIRST_IF_SEVERAL):
+    """
+    (avg_snr, None) for a scored file, (None, skip_reason) otherwise. Never
+    prints. streaming=True reads the file in chunks (stream_window_snr_result);
+    incremental=True uses the approximate incremental_windowed_snr.
+    drop_first is the first-window rule (DROP_FIRST_IF_SEVERAL or
+    DROP_FIRST_ALWAYS).
+    """
+    _check_drop_first(drop_first)
+    if streaming:
+        if incremental:
+            raise ValueError("streaming and incremental cannot be combined")
+        return stream_window_snr_result(audio_path, window, hop, min_duration, partial_windows,
+                                        drop_first=drop_first)
+    snr_values, reason = window_snr_values(audio_path, window, hop, min_duration,
+                                           partial_windows, incremental)
+    if reason is not None:
+        return None, reason
+    return _average_snr(snr_values, drop_first), None
+
+
+def window_snr_values(audio_path, window=6.0, hop=1.0, min_duration=7.0,
+                      partial_windows=False, incremental=False):
+    """
+    (per-window SNRs, None) for a scored file, first window included, or
+    (None, skip_reason); _average_snr of the values (with the same
+    drop_first rule) is what window_snr_result returns.
+    """
+    audio, sample_rate, reason = _load_for_snr(audio_path, min_duration)
+    if reason is not None:
+        return None, reason
+    if incremental:
+        snr_values = incremental_windowed_snr(audio, sample_rate, window, hop)
+        if partial_windows:
+            tail = [wada_snr(_as_float(w)) for w in tail_windows(audio, sample_rate, window, hop)]
+            snr_values = np.concatenate([snr_values, tail])
+    else:
+        snr_values = windowed_snr(audio, sample_rate, window, hop, partial_windows)
+    if len(snr_values) == 0:
+        return None, TOO_SHORT  # shorter than one hop
+    return snr_values, None
+
+
+def cached_window_snr_result(audio_path, cache=None, **options):
+    """window_snr_result, looked up in / stored to an snr_cache.SNRCache if given."""
+    if cache is None:
+        return window_snr_result(audio_path, **options)
+    params = snr_params(**options)
+    hit, snr, reason = cache.get(audio_path, params)
+    if not hit:
+        snr, reason = window_snr_result(audio_path, **options)
+        cache.put(audio_path, params, snr, reason)
+    return snr, reason
+
+
+
+# --- Threshold decisions ---
+
+def _scored_groups(audio, sample_rate, window=6.0, hop=1.0, partial_windows=False, chunk=8):
+    # Per-window SNRs in file order, `chunk` windows at a time (same values
+    # as windowed_snr)
+    windows = sliding_windows(audio, sample_rate, window, hop)
+    for start in range(0, len(windows), chunk):
+        rows = windows[start:start + chunk]
+        yield wada_snr_int16(rows) if audio.dtype == np.int16 else wada_snr_batch(rows)
+    if partial_windows:
+        for w in tail_windows(audio, sample_rate, window, hop):
+            yield [wada_snr(_as_float(w))]
+
+
+def window_snr_decision(audio_path, threshold=15.0, window=6.0, hop=1.0, min_duration=7.0,
+                        partial_windows=False, chunk=8, drop_first=DROP_FIRST_IF_SEVERAL):
+    """
+    Decide-only form of window_snr_result: whether the file's (rounded)
+    average SNR is >= threshold, scoring windows `chunk` at a time and
+    stopping as soon as the outcome is certain.
+
+    Every window SNR lies in the WADA table range [db_vals[0], db_vals[-1]]
+    (-20 to 100 dB), so after k of n windows the final average is bounded by
+    the running sum with the remaining windows all at -20 or all at 100 dB.
+    Windows not yet scored may also turn out NaN (and be left out of the
+    nanmean), which the bounds allow for.
+
+    Returns (passed, estimate, None) for a scored file, where estimate is
+    the average of the windows scored so far (the window_snr value when
+    every window was needed) and always lies on the `passed` side of the
+    threshold; (None, None, skip_reason) otherwise.
+    """
+    _check_drop_first(drop_first)
+    audio, sample_rate, reason = _load_for_snr(audio_path, min_duration)
+    if reason is not None:
+        return None, None, reason
+    n_full, n_windows = _window_counts(len(audio), sample_rate, window, hop, partial_windows)
+    if n_windows == 0:
+        return None, None, TOO_SHORT  # shorter than one hop
+
+    low_db, high_db = float(db_vals[0]), float(db_vals[-1])
+    slack = 1e-9  # float rounding of the per-window values and the sums
+    scored = []
+    total, count = 0.0, 0  # sum / number of non-NaN windows that count
+    for values in _scored_groups(audio, sample_rate, window, hop, partial_windows, chunk):
+        for snr in values:
+            # First value of SNR is ignored (when there is more than one)
+            counts = scored or (n_windows == 1 and drop_first != DROP_FIRST_ALWAYS)
+            if counts and not np.isnan(snr):
+                total += snr
+                count += 1
+            scored.append(snr)
+        remaining = n_windows - len(scored)
+        if remaining == 0:
+            break
+
+        mean = total / count if count else np.nan
+        low = min(mean, (total + remaining * low_db) / (count + remaining)) if count else low_db
+        high = max(mean, (total + remaining * high_db) / (count + remaining)) if count else high_db
+        if count and np.round(low - slack, 2) >= threshold:
+            return True, np.float64(mean).round(2), None
+        if np.round(high + slack, 2) < threshold:
+            return False, (np.float64(mean).round(2) if count else None), None
+
+    avg_snr = _average_snr(scored, drop_first)
+    return bool(avg_snr >= threshold), avg_snr, None
+
+
+def cached_window_snr_decision(audio_path, threshold=15.0, cache=None, **options):
+    """
+    window_snr_decision, answered from the cache when it already holds the
+    exact value. Only skip reasons are written back, since a decision
+    usually leaves the average unfinished.
+    """
+    if cache is not None:
+        params = snr_params(**options)
+        hit, snr, reason = cache.get(audio_path, params)
+        if hit:
+            if reason is not None:
+                return None, None, reason
+            return bool(snr >= threshold), snr, None
+    passed, estimate, reason = window_snr_decision(audio_path, threshold, **options)
+    if cache is not None and reason is not None:
+        cache.put(audio_path, params, None, reason)
+    return passed, estimate, reason
+
+def float64_reference_snr(audio_path, window=6.0, hop=1.0, partial_windows=False):
+    """
+    window_snr computed on a float64 decode, as a reference for the int16 /
+    float32 path. Gating is skipped; the file is assumed to be scorable.
+    """
+    import soundfile as sf
+    audio, sample_rate = sf.read(audio_path, dtype='float64')
+    return _average_snr(windowed_snr(to_mono(audio), sample_rate, window, hop, partial_windows))
+
+
+def compare_with_csv(csv_path, audio_root, reference_float64=False, **options):
+    """
+    Re-score the files listed in a results CSV (SpeakerID, Filename, SNR_dB,
+    e.g. MPS_SNR_Results.csv, files under audio_root/SpeakerID/) and return
+    (path, stored, recomputed, float64_or_None) rows.
+
+    Tolerance of the int16 / float32 path: int16 -> float32 is exact, so
+    windows are bit-identical to the librosa float32 windows the stored
+    CSVs were produced from, and recomputed values should equal the stored
+    ones (|diff| < 0.005, i.e. the 2-decimal rounding). Against a float64
+    decode, only windows whose statistic lies within float32 rounding of a
+    table edge can change, by one 1 dB step, which moves a 60 s MPS file
+    (54 windows) by ~0.02 dB; none changed on 200 synthetic 7-60 s files
+    (5622 windows) at -10 to 60 dB SNR.
+    """
+    rows = []
+    with open(csv_path, newline='') as f:
+        for row in csv.DictReader(f):
+            path = os.path.join(audio_root, row['SpeakerID'], row['Filename'])
+            snr, _ = window_snr_result(path, **options)
+            reference = float64_reference_snr(path) if reference_float64 and snr is not None else None
+            rows.append((path, float(row['SNR_dB']), snr, reference))
+    return rows
+
+
+def _report_skip(audio_path, reason):
+    if reason == NOT_16_BIT:
+        print(f"{audio_path}: not a 16-bit file")
+    elif reason == TOO_SHORT:
+        print(audio_path + " is too short")
+
+
+def window_snr(audio_path, cache=None, **options):
+    snr, reason = cached_window_snr_result(audio_path, cache, **options)
+    _report_skip(audio_path, reason)
+    return snr
+
+
+def incremental_window_snr(audio_path, cache=None, **options):
+    """Approximate window_snr using incremental_windowed_snr (see its accuracy note)."""
+    return window_snr(audio_path, cache, incremental=True, **options)
+
+
+def streaming_window_snr(audio_path, cache=None, **options):
+    """Drop-in alternative to window_snr for very long recordings (constant memory)."""
+    return window_snr(audio_path, cache, streaming=True, **options)
+
+
+# --- Parallel execution ---
+
+def _init_worker(tables):
+    # Install the WADA tables once per worker process
+    global db_vals, g_vals, _g_suffix_min
+    db_vals, g_vals = tables
+    _g_suffix_min = np.minimum.accumulate(g_vals[::-1])[::-1]
+
+
+def _snr_task(task):
+    audio_path, options = task
+    try:
+        snr, reason = window_snr_result(audio_path, **options)
+        return audio_path, snr, reason, None
+    except Exception as e:
+        # Captured here so one bad file never takes the pool down
+        return audio_path, None, None, f"{type(e).__name__}: {e}"
+
+
+def _snr_chunk(tasks):
+    return [_snr_task(task) for task in tasks]
+
+
+def map_window_snr(audio_paths, workers=1, chunksize=4, cache=None, durations=None, **options):
+    """
+    Yield (audio_path, snr, skip_reason, error) for every path, in the order
+    given, whatever order the workers finish in. workers=1 runs in-process;
+    otherwise a process pool of that many workers is used. With a cache,
+    only files missing from it are computed; new results are stored by
+    this (the parent) process. With durations ({path: seconds}, e.g. from
+    wav_index), pool work is submitted longest-first so one long file does
+    not leave the pool idle at the end. Either way the pool is sent
+    `chunksize` files per task.
+    """
+    audio_paths = list(audio_paths)
+    cached = {}
+    if cache is not None:
+        params = snr_params(**options)
+        for path in audio_paths:
+            hit, snr, reason = cache.get(path, params)
+            if hit:
+                cached[path] = (path, snr, reason, None)
+    tasks = [(path, options) for path in audio_paths if path not in cached]
+
+    pool = None
+    if tasks and (workers is None or workers > 1):
+        from concurrent.futures import ProcessPoolExecutor
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                   initargs=((db_vals, g_vals),))
+        if durations is not None:
+            by_length = sorted(tasks, key=lambda task: -durations.get(task[0], 0.0))
+            chunk_of = {}  # path -> (future of its chunk, position in the chunk)
+            for start in range(0, len(by_length), chunksize):
+                chunk = by_length[start:start + chunksize]
+                future = pool.submit(_snr_chunk, chunk)
+                for i, (path, _) in enumerate(chunk):
+                    chunk_of[path] = (future, i)
+            computed = (chunk_of[path][0].result()[chunk_of[path][1]] for path, _ in tasks)
+        else:
+            computed = pool.map(_snr_task, tasks, chunksize=chunksize)
+    else:
+        computed = map(_snr_task, tasks)
+
+    try:
+        for path in audio_paths:
+            if path in cached:
+                yield cached[path]
+                continue
+            result = next(computed)
+            if cache is not None and result[3] is None:
+                cache.put(path, params, result[1], result[2])
+            yield result
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
@@ -0,0 +1,211 @@
+"""
+Stratified speaker / utterance sampling from the corpus index.
+
+Instead of shuffling speakers, probing files one at a time and finding
+out late that a speaker is short of good files, the sample is drawn from
+what the corpus index (corpus_index.py) already knows: a file is eligible
+when it has audio and a cached SNR >= the floor, and a speaker is
+eligible when it has at least `utterances` eligible files. Speakers are
+drawn per stratum (gender and an inclusive age or grade range), and the
+whole sample is checked for feasibility before anything is drawn, so
+nothing is copied for a selection that cannot be completed.
+
+The SNR estimator is never called here. Files without a cached SNR are
+not eligible; the feasibility report counts them, so a shortfall they
+could cover is visible (score them with snr_cli.py score --cache first).
+
+The draw only depends on the seed and the index contents: speakers are
+shuffled per stratum with a seeded generator, and each speaker's files are
+taken in utterance_selection.speaker_order.
+
+This is a separate tool, not a step of the Speech_3 selector: that script
+keeps its own seeded 4 female / 6 male draw (and the files it has always
+selected) and needs no index. A manifest from here covers the same
+4f:6-10 + 6m:6-10 selection once the index is built and scored.
+
+Usage:
+    python stratified_sampler.py <index.sqlite> <manifest.csv> --stratum f:6-10:4 --stratum m:6-10:6
+    python stratified_sampler.py <index.sqlite> <manifest.csv> --corpus mps --bin-by grade --stratum f:1-9:5 ...
+        [--utterances 15] [--min-snr 15] [--seed 0] [--check]
+"""
+
+import os
+import sys
+import csv
+import random
+import argparse
+from collections import defaultdict, namedtuple
+
+from corpus_index import SPEECH_OCEAN, MPS, CorpusIndex
+from utterance_selection import speaker_order
+
+# `speakers` speakers of one gender with age (or grade) in [low, high]
+Stratum = namedtuple("Stratum", "gender low high speakers")
+
+MANIFEST_COLUMNS = ["stratum", "speaker", "age", "gender", "grade", "utterance", "audio_file",
+                    "text", "snr", "path"]
+
+
+class InfeasibleSample(ValueError):
+    """The index does not hold enough eligible speakers for every stratum."""
+
+    def __init__(self, report):
+        self.report = report
+        short = [line for line in format_report(report) if line.startswith("SHORT")]
+        super().__init__("not enough eligible speakers:\n" + "\n".join(short))
+
+
+def parse_stratum(spec):
+    """'f:6-10:4' -> Stratum('f', 6, 10, 4)."""
+    try:
+        gender, bounds, speakers = spec.split(":")
+        low, high = bounds.split("-")
+        stratum = Stratum(gender.lower()[:1], int(low), int(high), int(speakers))
+    except ValueError:
+        raise ValueError(f"bad stratum {spec!r}, expected <f|m>:<low>-<high>:<speakers>") from None
+    if stratum.gender not in ("f", "m") or stratum.low > stratum.high or stratum.speakers < 0:
+        raise ValueError(f"bad stratum {spec!r}")
+    return stratum
+
+
+def stratum_label(stratum):
+    return f"{stratum.gender}:{stratum.low}-{stratum.high}"
+
+
+def _check_strata(strata):
+    # A speaker must fall in at most one stratum
+    for i, a in enumerate(strata):
+        for b in strata[i + 1:]:
+            if a.gender == b.gender and a.low <= b.high and b.low <= a.high:
+                raise ValueError(f"strata {stratum_label(a)} and {stratum_label(b)} overlap")
+
+
+def eligible_files(index, corpus, min_snr=15.0, bin_by="age"):
+    """
+    ({speaker: (bin value, gender, age, grade)}, {speaker: [eligible
+    utterance rows]}, {speaker: number of files with audio but no cached SNR}).
+    Rows are (utterance, path, transcript, snr).
+    """
+    if bin_by not in ("age", "grade"):
+        raise ValueError(f"bin_by must be 'age' or 'grade', not {bin_by!r}")
+    speakers = {spk: (age if bin_by == "age" else grade, gender, age, grade)
+                for spk, age, gender, grade in index.query(
+                    "SELECT speaker, age, gender, grade FROM speakers WHERE corpus = ?", (corpus,))}
+    files = defaultdict(list)
+    for spk, utt, path, transcript, snr in index.query(
+            "SELECT speaker, utterance, path, transcript, snr FROM utterances"
+            " WHERE corpus = ? AND path IS NOT NULL AND snr >= ?", (corpus, min_snr)):
+        files[spk].append((utt, path, transcript, snr))
+    unscored = dict(index.query(
+        "SELECT speaker, COUNT(*) FROM utterances"
+        " WHERE corpus = ? AND path IS NOT NULL AND snr IS NULL AND snr_reason IS NULL"
+        " GROUP BY speaker", (corpus,)))
+    return speakers, files, unscored
+
+
+def feasibility(strata, speakers, files, unscored, utterances=15):
+    """
+    Per stratum: dict(stratum, needed, in_bin, eligible, pending), where
+    `eligible` lists the speakers with >= `utterances` eligible files and
+    `pending` counts the other speakers whose unscored files could still
+    make up the difference.
+    """
+    report = []
+    for stratum in strata:
+        in_bin = [spk for spk, (value, gender, _, _) in speakers.items()
+                  if gender == stratum.gender and value is not None and stratum.low <= value <= stratum.high]
+        eligible = sorted(spk for spk in in_bin if len(files.get(spk, ())) >= utterances)
+        pending = sum(1 for spk in in_bin if spk not in eligible
+                      and len(files.get(spk, ())) + unscored.get(spk, 0) >= utterances)
+        report.append({"stratum": stratum, "needed": stratum.speakers, "in_bin": len(in_bin),
+                       "eligible": eligible, "pending": pending})
+    return report
+
+
+def format_report(report):
+    lines = []
+    for entry in report:
+        ok = len(entry["eligible"]) >= entry["needed"]
+        line = (f"{'ok' if ok else 'SHORT'}\t{stratum_label(entry['stratum'])}: need {entry['needed']}, "
+                f"{len(entry['eligible'])} eligible of {entry['in_bin']} speakers")
+        if entry["pending"]:
+            line += f" ({entry['pending']} more could qualify once their unscored files are scored)"
+        lines.append(line)
+    return lines
+
+
+def sample(index, corpus, strata, utterances=15, min_snr=15.0, seed=0, bin_by="age"):
+    """
+    Manifest rows (dicts with MANIFEST_COLUMNS) of `utterances` files for
+    each drawn speaker, strata in the given order. Raises InfeasibleSample
+    before drawing anything when a stratum cannot be filled.
+    """
+    strata = list(strata)
+    _check_strata(strata)
+    speakers, files, unscored = eligible_files(index, corpus, min_snr, bin_by)
+    report = feasibility(strata, speakers, files, unscored, utterances)
+    if any(len(entry["eligible"]) < entry["needed"] for entry in report):
+        raise InfeasibleSample(report)
+
+    rows = []
+    for entry in report:
+        stratum = entry["stratum"]
+        drawn = list(entry["eligible"])
+        random.Random(f"{seed}:{stratum_label(stratum)}").shuffle(drawn)
+        for spk in sorted(drawn[:stratum.speakers]):
+            _, gender, age, grade = speakers[spk]
+            by_path = {row[1]: row for row in files[spk]}
+            for path in speaker_order(by_path, spk, seed)[:utterances]:
+                utt, _, transcript, snr = by_path[path]
+                rows.append({"stratum": stratum_label(stratum), "speaker": spk, "age": age,
+                             "gender": gender, "grade": grade, "utterance": utt,
+                             "audio_file": os.path.basename(path), "text": transcript, "snr": snr,
+                             "path": path})
+    return rows
+
+
+def write_manifest(rows, manifest_path):
+    with open(manifest_path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=MANIFEST_COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Draw a stratified speaker/utterance sample from the corpus index.")
+    parser.add_argument("db", help="corpus index (corpus_index.py)")
+    parser.add_argument("manifest", help="output manifest CSV")
+    parser.add_argument("--corpus", choices=[SPEECH_OCEAN, MPS], default=SPEECH_OCEAN)
+    parser.add_argument("--stratum", action="append", type=parse_stratum, required=True,
+                        help="<f|m>:<low>-<high>:<speakers>, repeatable")
+    parser.add_argument("--bin-by", choices=["age", "grade"], default="age")
+    parser.add_argument("--utterances", type=int, default=15, help="files per speaker")
+    parser.add_argument("--min-snr", type=float, default=15.0, help="SNR floor (dB) of an eligible file")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--check", action="store_true", help="only report feasibility")
+    args = parser.parse_args(argv)
+
+    try:
+        _check_strata(args.stratum)
+    except ValueError as e:
+        parser.error(str(e))
+
+    with CorpusIndex(args.db) as index:
+        if args.check:
+            speakers, files, unscored = eligible_files(index, args.corpus, args.min_snr, args.bin_by)
+            report = feasibility(args.stratum, speakers, files, unscored, args.utterances)
+            print("\n".join(format_report(report)))
+            return 0 if all(len(e["eligible"]) >= e["needed"] for e in report) else 1
+        try:
+            rows = sample(index, args.corpus, args.stratum, args.utterances, args.min_snr,
+                          args.seed, args.bin_by)
+        except InfeasibleSample as e:
+            print(f"❌ {e}")
+            return 1
+    write_manifest(rows, args.manifest)
+    print(f"✅ {len({row['speaker'] for row in rows})} speakers, {len(rows)} files -> {args.manifest}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
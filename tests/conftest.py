@@ -0,0 +1,46 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+# The modules are top-level scripts, not a package
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SAMPLE_RATE = 16000
+
+
+@pytest.fixture
+def write_wav(tmp_path):
+    """write_wav(name, samples, sample_rate=16000) -> path of a 16-bit WAV under tmp_path."""
+    def write(name, samples, sample_rate=SAMPLE_RATE):
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        sf.write(str(path), np.asarray(samples), sample_rate, subtype="PCM_16")
+        return str(path)
+    return write
+
+
+@pytest.fixture
+def speech_wav(write_wav):
+    """speech_wav(name, duration, snr_db, seed, noise="white") -> path of a noisy speech-like WAV."""
+    import snr_benchmark
+
+    def make(name, duration, snr_db, seed=0, noise="white"):
+        rng = np.random.default_rng(seed)
+        clean = snr_benchmark.speech_like(duration, rng)
+        mixed = snr_benchmark.mix_at_snr(clean, snr_benchmark.noise(noise, len(clean), rng), snr_db)
+        return write_wav(name, mixed)
+    return make
+
+
+@pytest.fixture
+def silent_tail_wav(write_wav):
+    """silent_tail_wav(name) -> 8 s WAV, loud for the first 0.5 s only: every window after the first is digital silence, so the SNR is NaN."""
+    def make(name):
+        samples = np.zeros(8 * SAMPLE_RATE)
+        samples[:SAMPLE_RATE // 2] = 0.5 * np.sin(np.arange(SAMPLE_RATE // 2) * 0.3)
+        return write_wav(name, samples)
+    return make
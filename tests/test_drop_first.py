@@ -0,0 +1,41 @@
+import math
+
+import pytest
+
+import snr_utils
+from snr_utils import DROP_FIRST_ALWAYS, DROP_FIRST_IF_SEVERAL
+
+OCEAN = {"min_duration": 0.5, "partial_windows": True}
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_one_window_file(speech_wav, streaming):
+    path = speech_wav("one_window.wav", 1.5, 15, seed=4)
+    snr, reason = snr_utils.window_snr_result(path, streaming=streaming, **OCEAN)
+    assert reason is None and math.isfinite(snr)
+    snr, reason = snr_utils.window_snr_result(path, streaming=streaming, drop_first=DROP_FIRST_ALWAYS, **OCEAN)
+    assert reason is None and math.isnan(snr)
+
+
+def test_decision_follows_rule(speech_wav):
+    path = speech_wav("one_window.wav", 1.5, 30, seed=4)
+    exact, _ = snr_utils.window_snr_result(path, **OCEAN)
+    passed, estimate, _ = snr_utils.window_snr_decision(path, threshold=exact - 1, **OCEAN)
+    assert passed and estimate == exact
+    passed, estimate, _ = snr_utils.window_snr_decision(path, threshold=exact - 1,
+                                                        drop_first=DROP_FIRST_ALWAYS, **OCEAN)
+    assert not passed and math.isnan(estimate)
+
+
+def test_rules_agree_with_several_windows(speech_wav):
+    path = speech_wav("several.wav", 9.0, 15, seed=5)
+    for rule in (OCEAN, {"min_duration": 7.0}):
+        assert snr_utils.window_snr_result(path, drop_first=DROP_FIRST_ALWAYS, **rule) == \
+            snr_utils.window_snr_result(path, **rule)
+
+
+def test_cache_key():
+    assert snr_utils.snr_params(**OCEAN) == snr_utils.snr_params(drop_first=DROP_FIRST_IF_SEVERAL, **OCEAN)
+    assert snr_utils.snr_params(**OCEAN) != snr_utils.snr_params(drop_first=DROP_FIRST_ALWAYS, **OCEAN)
+    with pytest.raises(ValueError):
+        snr_utils.snr_params(drop_first="never")
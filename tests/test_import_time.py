@@ -0,0 +1,11 @@
+import snr_cli
+
+
+def test_snr_modules_start_fast():
+    assert {"scipy", "librosa", "matplotlib"} <= set(snr_cli.HEAVY_MODULES)
+    # best of three cold starts, so one slow interpreter launch does not fail the budget
+    runs = [snr_cli.measure_import_time() for _ in range(3)]
+    for _, _, imported in runs:
+        heavy = sorted(m for m in imported if m.split(".")[0] in snr_cli.HEAVY_MODULES)
+        assert not heavy, f"imported at start-up: {', '.join(heavy)}"
+    assert min(total_ms for total_ms, _, _ in runs) <= snr_cli.IMPORT_BUDGET_MS
@@ -0,0 +1,35 @@
+import concurrent.futures
+
+import pytest
+
+import snr_utils
+
+
+@pytest.fixture
+def corpus(speech_wav, write_wav):
+    paths = [speech_wav(f"spk{i % 2}/{i}.wav", 7.5 + 2 * i, 5 + 5 * i, seed=i) for i in range(5)]
+    paths.append(write_wav("spk0/short.wav", [0.1, -0.1] * 8000))  # 1 s: too short
+    return paths
+
+
+def test_parallel_matches_serial(corpus):
+    serial = list(snr_utils.map_window_snr(corpus))
+    assert [r[0] for r in serial] == corpus
+    durations = {path: i for i, path in enumerate(corpus)}
+    assert list(snr_utils.map_window_snr(corpus, workers=2, chunksize=2, durations=durations)) == serial
+    assert list(snr_utils.map_window_snr(corpus, workers=2, chunksize=2)) == serial
+
+
+def test_chunksize_honoured_when_ordered_by_duration(corpus, monkeypatch):
+    submitted = []
+
+    class CountingPool(concurrent.futures.ProcessPoolExecutor):
+        def submit(self, fn, *args, **kwargs):
+            submitted.append(len(args[0]))
+            return super().submit(fn, *args, **kwargs)
+
+    monkeypatch.setattr(concurrent.futures, "ProcessPoolExecutor", CountingPool)
+    durations = {path: i for i, path in enumerate(corpus)}
+    results = list(snr_utils.map_window_snr(corpus, workers=2, chunksize=4, durations=durations))
+    assert [r[0] for r in results] == corpus
+    assert submitted == [4, 2]
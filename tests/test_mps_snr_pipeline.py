@@ -0,0 +1,37 @@
+import csv
+import math
+import os
+
+import numpy as np
+
+from materialise import MANIFEST_FILENAME
+from mps_snr_pipeline import SNRHistogram, run_pipeline
+
+
+def test_histogram_matches_np_histogram():
+    values = [3.2, 15.0, 15.0, 22.7, -4.0, 40.0, float("nan"), 9.99]
+    histogram = SNRHistogram()
+    for value in values:
+        histogram.add(value)
+    finite = [v for v in values if math.isfinite(v)]
+    counts, bins = np.histogram(finite, np.arange(0, max(finite) + 5, 5))
+    assert np.array_equal(histogram.bins(), bins)
+    assert np.array_equal(histogram.counts(), counts)
+    assert histogram.total == len(values) and histogram.non_finite == 1
+
+
+def test_nan_snr_does_not_abort(tmp_path, speech_wav, silent_tail_wav):
+    root = tmp_path / "mps"
+    speech_wav("mps/spk1/clean.wav", 9.0, 30, seed=1)
+    silent_tail_wav("mps/spk1/nan.wav")
+    target = tmp_path / "shortlist"
+    output_csv, plot = tmp_path / "snr.csv", tmp_path / "snr.png"
+
+    histogram, results = run_pipeline(str(root), str(target), str(output_csv), str(plot))
+
+    with open(output_csv, newline="") as f:
+        rows = {row["Filename"]: row["SNR_dB"] for row in csv.DictReader(f)}
+    assert rows["nan.wav"] == "nan" and float(rows["clean.wav"]) >= 15
+    assert [os.path.basename(r["target"]) for r in results] == ["clean.wav"]
+    assert os.path.exists(target / MANIFEST_FILENAME) and os.path.exists(plot)
+    assert histogram.total == 2 and histogram.non_finite == 1
@@ -0,0 +1,51 @@
+import importlib.util
+import math
+import os
+
+import pytest
+
+import snr_utils
+from conftest import ROOT
+from snr_cache import SNRCache
+
+
+def _load_script(filename, name):
+    spec = importlib.util.spec_from_file_location(name, os.path.join(ROOT, filename))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_nan_round_trip(tmp_path, silent_tail_wav):
+    path = silent_tail_wav("nan.wav")
+    snr, reason = snr_utils.window_snr_result(path)
+    assert reason is None and math.isnan(snr)
+
+    with SNRCache(str(tmp_path / "cache.sqlite")) as cache:
+        params = snr_utils.snr_params()
+        cache.put(path, params, snr, reason)
+        hit, cached_snr, cached_reason = cache.get(path, params)
+        assert hit and cached_reason is None and math.isnan(cached_snr)
+        assert cache.stats()["scored"] == 1 and cache.stats()["skipped"] == 0
+        warm_snr, warm_reason = snr_utils.cached_window_snr_result(path, cache)
+        assert warm_reason is None and math.isnan(warm_snr)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_cold_and_warm_csv_identical(tmp_path, speech_wav, silent_tail_wav, workers):
+    root = tmp_path / "mps"
+    speech_wav("mps/spk1/a.wav", 9.0, 20, seed=1)
+    silent_tail_wav("mps/spk1/nan.wav")
+    speech_wav("mps/spk2/b.wav", 8.0, 5, seed=2)
+    step_1 = _load_script("1._1_step_MPS_files_SNR_Finding_Code.py", "mps_snr_step_1")
+
+    uncached = tmp_path / "uncached.csv"
+    step_1.process_mps_dataset(str(root), str(uncached), workers=workers)
+    outputs = []
+    with SNRCache(str(tmp_path / "cache.sqlite")) as cache:
+        for run in ("cold", "warm"):
+            output = tmp_path / f"{run}.csv"
+            step_1.process_mps_dataset(str(root), str(output), workers=workers, cache=cache)
+            outputs.append(output.read_text())
+    assert "nan.wav,nan" in uncached.read_text()
+    assert outputs == [uncached.read_text()] * 2
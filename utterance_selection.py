@@ -0,0 +1,166 @@
+"""
+Quota-driven utterance selection across speakers.
+
+For every speaker the candidate files are put in a seeded random order and
+the first `quota` files whose windowed SNR is >= threshold are selected,
+which is what walking that order one file at a time gives. Candidates of
+all speakers are evaluated concurrently on a process pool, a few files
+ahead of what each speaker still needs; once a speaker's selection is
+settled, its queued candidates are cancelled. The selection depends only
+on the seed and the candidate lists, never on the order workers finish in.
+"""
+
+import random
+
+import snr_utils
+
+
+def speaker_order(paths, speaker, seed=0):
+    """The candidates of one speaker in their seeded random order."""
+    order = sorted(paths)
+    random.Random(f"{seed}:{speaker}").shuffle(order)
+    return order
+
+
+def _evaluate(task):
+    # (snr, skip_reason, error) of one candidate; a file that fails to score never
+    # passes, and the error is returned rather than raised so it cannot take the pool down
+    audio_path, options = task
+    try:
+        snr, reason = snr_utils.window_snr_result(audio_path, **options)
+        return snr, reason, None
+    except Exception as e:
+        return None, None, f"{type(e).__name__}: {e}"
+
+
+class _Speaker:
+    # Evaluation state of one speaker's ordered candidates
+    def __init__(self, order, quota):
+        self.order = order
+        self.quota = quota
+        self.outcomes = [None] * len(order)  # (passed, snr) once known
+        self.next_index = 0  # next candidate to submit
+        self.prefix = 0  # outcomes[:prefix] are all known
+        self.selected = []  # passes within the prefix
+        self.known_passes = 0
+        self.in_flight = 0
+
+    def record(self, index, passed, snr):
+        self.outcomes[index] = (passed, snr)
+        self.known_passes += passed
+        while self.prefix < len(self.order) and len(self.selected) < self.quota:
+            outcome = self.outcomes[self.prefix]
+            if outcome is None:
+                break
+            if outcome[0]:
+                self.selected.append((self.order[self.prefix], outcome[1]))
+            self.prefix += 1
+
+    @property
+    def settled(self):
+        return len(self.selected) == self.quota or self.prefix == len(self.order)
+
+    def wants_more(self, lookahead):
+        if self.settled or self.next_index == len(self.order):
+            return False
+        return self.in_flight < max(0, self.quota - self.known_passes) + lookahead
+
+
+def select_utterances(candidates, quota=15, threshold=15.0, seed=0, workers=1, cache=None,
+                      lookahead=2, **options):
+    """
+    {speaker: [(path, snr), ...]} with up to `quota` files per speaker, in
+    the seeded order (speaker_order), from {speaker: [candidate paths]}.
+
+    workers=1 evaluates in-process, one file at a time; otherwise a process
+    pool is shared by all speakers. Each candidate is scored exactly once
+    (the selected files need their exact value anyway, so a decide-only
+    pass first would only add work); files already in the
+    snr_cache.SNRCache are answered from it and new results are stored by
+    this (the parent) process. `options` are the window_snr_result options
+    (e.g. min_duration=0.5, partial_windows=True for Speech Ocean).
+    """
+    speakers = {spk: _Speaker(speaker_order(paths, spk, seed), quota)
+                for spk, paths in candidates.items()}
+    params = snr_utils.snr_params(**options)
+
+    def passes(snr):
+        return snr is not None and bool(snr >= threshold)
+
+    def cached(path):
+        if cache is None:
+            return None
+        hit, snr, _ = cache.get(path, params)
+        return (passes(snr), snr) if hit else None
+
+    def store(path, snr, reason, error):
+        if error is not None:
+            # Skipped, and left out of the cache so it is retried on the next run
+            print(f"Skipping {path}: {error}")
+        elif cache is not None and (snr is not None or reason is not None):
+            cache.put(path, params, snr, reason)
+
+    def next_task(state):
+        # Advance to the next candidate not answered from the cache
+        while state.next_index < len(state.order) and not state.settled:
+            index = state.next_index
+            state.next_index += 1
+            hit = cached(state.order[index])
+            if hit is None:
+                return index
+            state.record(index, *hit)
+        return None
+
+    if workers == 1:
+        for state in speakers.values():
+            while (index := next_task(state)) is not None:
+                path = state.order[index]
+                snr, reason, error = _evaluate((path, options))
+                store(path, snr, reason, error)
+                state.record(index, passes(snr), snr)
+        return {spk: state.selected for spk, state in speakers.items()}
+
+    from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=snr_utils._init_worker,
+                               initargs=((snr_utils.db_vals, snr_utils.g_vals),))
+    pending = {}  # future -> (speaker, candidate index)
+    try:
+        def fill():
+            # Round-robin over speakers, so all of them progress together
+            submitted = True
+            while submitted:
+                submitted = False
+                for spk, state in speakers.items():
+                    if state.wants_more(lookahead):
+                        index = next_task(state)
+                        if index is None:
+                            continue
+                        task = (state.order[index], options)
+                        pending[pool.submit(_evaluate, task)] = (spk, index)
+                        state.in_flight += 1
+                        submitted = True
+
+        fill()
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                spk, index = pending.pop(future)
+                state = speakers[spk]
+                state.in_flight -= 1
+                if future.cancelled():
+                    continue
+                snr, reason, error = future.result()
+                store(state.order[index], snr, reason, error)
+                state.record(index, passes(snr), snr)
+                if state.settled:
+                    # Quota met: drop this speaker's queued candidates
+                    for other, (other_spk, _) in list(pending.items()):
+                        if other_spk == spk and other.cancel():
+                            pending.pop(other)
+                            state.in_flight -= 1
+            fill()
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+    return {spk: state.selected for spk, state in speakers.items()}
@@ -0,0 +1,120 @@
+"""
+Header-only index of the WAV files in a corpus tree.
+
+Sample width, rate, channel count and frame count are read from the RIFF
+header with the wave module (no audio is decoded) and kept in an SQLite
+file, by default `.wav_headers.sqlite` in the scanned root. Re-scans only
+re-read headers of files whose size or mtime changed.
+
+Usage:
+    python wav_index.py <root> [<root> ...]
+"""
+
+import os
+import sys
+import wave
+import sqlite3
+
+INDEX_FILENAME = ".wav_headers.sqlite"
+
+
+def default_index_path(root):
+    return os.path.join(root, INDEX_FILENAME)
+
+
+def read_header(path):
+    """dict(sampwidth, rate, channels, frames, error) from the header alone."""
+    try:
+        with wave.open(path, 'rb') as wav:
+            return {
+                "sampwidth": wav.getsampwidth(),
+                "rate": wav.getframerate(),
+                "channels": wav.getnchannels(),
+                "frames": wav.getnframes(),
+                "error": None,
+            }
+    except (wave.Error, EOFError, OSError) as e:
+        return {"sampwidth": None, "rate": None, "channels": None, "frames": None,
+                "error": f"{type(e).__name__}: {e}"}
+
+
+def header_duration(header):
+    if header["error"] is not None or not header["rate"]:
+        return None
+    return header["frames"] / header["rate"]
+
+
+def walk_wavs(root):
+    """Every .wav under root, in os.walk order."""
+    for dirpath, _, files in os.walk(root):
+        for fname in files:
+            if fname.lower().endswith(".wav"):
+                yield os.path.join(dirpath, fname)
+
+
+def longest_first(paths, headers):
+    """Paths ordered by decreasing duration (unknown durations last)."""
+    return sorted(paths, key=lambda p: -(header_duration(headers[p]) or 0.0))
+
+
+class WavHeaderIndex:
+    def __init__(self, db_path):
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS wav_headers ("
+            " path TEXT PRIMARY KEY,"
+            " size INTEGER NOT NULL,"
+            " mtime_ns INTEGER NOT NULL,"
+            " sampwidth INTEGER,"
+            " rate INTEGER,"
+            " channels INTEGER,"
+            " frames INTEGER,"
+            " error TEXT)"
+        )
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def headers(self, paths):
+        """{path: header} for the given paths, reading only new or changed headers."""
+        result = {}
+        updates = []
+        for path in paths:
+            full = os.path.abspath(path)
+            st = os.stat(full)
+            row = self.conn.execute(
+                "SELECT size, mtime_ns, sampwidth, rate, channels, frames, error"
+                " FROM wav_headers WHERE path = ?", (full,)
+            ).fetchone()
+            if row is not None and row[0] == st.st_size and row[1] == st.st_mtime_ns:
+                header = dict(zip(("sampwidth", "rate", "channels", "frames", "error"), row[2:]))
+            else:
+                header = read_header(full)
+                updates.append((full, st.st_size, st.st_mtime_ns, header["sampwidth"], header["rate"],
+                                header["channels"], header["frames"], header["error"]))
+            result[path] = header
+        if updates:
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO wav_headers VALUES (?, ?, ?, ?, ?, ?, ?, ?)", updates)
+        return result
+
+    def scan(self, root):
+        """{path: header} for every .wav under root, in os.walk order."""
+        return self.headers(list(walk_wavs(root)))
+
+
+if __name__ == "__main__":
+    for root in sys.argv[1:]:
+        with WavHeaderIndex(default_index_path(root)) as index:
+            headers = index.scan(root)
+        total = sum(header_duration(h) or 0.0 for h in headers.values())
+        bad = sum(h["error"] is not None for h in headers.values())
+        print(f"{root}: {len(headers)} files, {total / 3600:.2f} h of audio, {bad} unreadable headers")
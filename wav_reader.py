@@ -0,0 +1,101 @@
+"""
+Zero-copy reader for 16-bit PCM WAV files.
+
+The RIFF header is parsed directly and the data chunk is exposed as a
+read-only np.memmap of int16 samples, so windows are slices of the mapped
+file and the OS page cache is shared between worker processes reading the
+same recordings. Anything that is not plain little-endian 16-bit PCM with
+a well-formed data chunk (float or 24-bit WAVs, RIFX, truncated or padded
+data chunks, ...) is read with soundfile instead, which is only imported
+when such a file is met.
+"""
+
+import struct
+
+import numpy as np
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+# Sub-format GUID of WAVE_FORMAT_EXTENSIBLE files holding plain PCM
+KSDATAFORMAT_SUBTYPE_PCM = bytes.fromhex("0100000000001000800000aa00389b71")
+
+
+def parse_pcm16_layout(path):
+    """
+    (channels, sample_rate, data_offset, n_frames) when `path` is a
+    little-endian 16-bit PCM WAV whose data chunk lies entirely inside the
+    file, None otherwise.
+    """
+    with open(path, "rb") as f:
+        riff = f.read(12)
+        if len(riff) < 12 or riff[:4] != b"RIFF" or riff[8:12] != b"WAVE":
+            return None
+        f.seek(0, 2)
+        file_size = f.tell()
+        position = 12
+        fmt = None
+        while position + 8 <= file_size:
+            f.seek(position)
+            chunk_id, chunk_size = struct.unpack("<4sI", f.read(8))
+            body = position + 8
+            if chunk_id == b"fmt ":
+                data = f.read(min(chunk_size, 40))
+                if len(data) < 16:
+                    return None
+                tag, channels, rate, _, block_align, bits = struct.unpack("<HHIIHH", data[:16])
+                if tag == WAVE_FORMAT_EXTENSIBLE:
+                    if len(data) < 40 or data[24:40] != KSDATAFORMAT_SUBTYPE_PCM:
+                        return None
+                elif tag != WAVE_FORMAT_PCM:
+                    return None
+                if bits != 16 or channels == 0 or block_align != 2 * channels:
+                    return None
+                fmt = (channels, rate)
+            elif chunk_id == b"data":
+                if fmt is None or body + chunk_size > file_size:
+                    return None
+                channels, rate = fmt
+                return channels, rate, body, chunk_size // (2 * channels)
+            position = body + chunk_size + (chunk_size & 1)  # chunks are word aligned
+    return None
+
+
+def read_pcm16(path):
+    """
+    (pcm, sample_rate) with pcm an int16 array of shape (frames,) for mono
+    or (frames, channels). Plain PCM files come back as a read-only memmap;
+    other layouts are decoded by soundfile.
+    """
+    layout = parse_pcm16_layout(path)
+    if layout is None:
+        import soundfile as sf
+        pcm, sample_rate = sf.read(path, dtype="int16")
+        return pcm, sample_rate
+    channels, sample_rate, offset, n_frames = layout
+    if n_frames == 0:
+        shape = (0,) if channels == 1 else (0, channels)
+        return np.empty(shape, dtype=np.int16), sample_rate
+    shape = (n_frames,) if channels == 1 else (n_frames, channels)
+    return np.memmap(path, dtype="<i2", mode="r", offset=offset, shape=shape), sample_rate
+
+
+def pcm_to_float32(pcm, out=None):
+    """int16 PCM to float32 in [-1, 1): exactly the values soundfile/librosa return."""
+    return np.multiply(pcm, np.float32(1 / 32768), out=out, dtype=np.float32)
+
+
+def read_float32_mono(path):
+    """
+    (samples, sample_rate) as float32 mono, the same array
+    librosa.load(path, sr=None) returns. 16-bit PCM goes through the memmap;
+    other formats are decoded by soundfile at full precision.
+    """
+    if parse_pcm16_layout(path) is not None:
+        pcm, sample_rate = read_pcm16(path)
+        samples = pcm_to_float32(pcm)
+    else:
+        import soundfile as sf
+        samples, sample_rate = sf.read(path, dtype="float32")
+    if samples.ndim > 1:
+        samples = samples.mean(axis=1)
+    return samples, sample_rate